@@ -7,14 +7,16 @@ S3バケット内のファイル操作を行うAPIエンドポイント:
 - POST /api/storage/batch-download: 一括ダウンロード（ZIP形式）
 """
 
+import codecs
 from datetime import datetime, timedelta
 from typing import Optional, List
 from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 from botocore.exceptions import ClientError
-from services.s3_service import S3Service, get_content_type
+from services.s3_service import S3Service, get_content_type, presigned_url_window_start
 from services.zip_service import (
     ZipStreamService,
     SizeLimitExceededError,
@@ -30,6 +32,9 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# プレビューで取得する1行あたりの上限バイト数（max_lines × この値までを先頭から取得）
+PREVIEW_MAX_BYTES_PER_LINE = 1024
+
 
 # ==================== Response Models ====================
 
@@ -132,6 +137,20 @@ def sort_files(files: List[dict], sort_by: str, order: str) -> List[dict]:
         return files
 
 
+# ==================== Dependencies ====================
+
+def get_s3_service() -> S3Service:
+    """
+    エンドポイントで使用するS3Serviceを取得する
+
+    テストでは app.dependency_overrides で差し替える。
+
+    Returns:
+        S3Service: S3サービスインスタンス
+    """
+    return S3Service()
+
+
 # ==================== Endpoints ====================
 
 @router.get("/storage/info", tags=["storage"], response_model=StorageInfoResponse)
@@ -169,7 +188,8 @@ async def list_files(
     sort_by: str = Query("name", description="ソート対象: name, size, last_modified"),
     order: str = Query("asc", description="ソート順: asc, desc"),
     page: int = Query(1, ge=1, description="ページ番号"),
-    per_page: int = Query(50, ge=1, le=100, description="1ページあたりの件数")
+    per_page: int = Query(50, ge=1, le=100, description="1ページあたりの件数"),
+    s3: S3Service = Depends(get_s3_service)
 ):
     """
     S3バケット内のファイル・フォルダ一覧を取得する
@@ -180,6 +200,7 @@ async def list_files(
         order: ソート順
         page: ページ番号
         per_page: 1ページあたりの件数
+        s3: S3サービス
 
     Returns:
         ListResponse: ファイル一覧、ディレクトリ一覧、ページネーション情報
@@ -191,7 +212,6 @@ async def list_files(
         raise HTTPException(status_code=400, detail="order must be 'asc' or 'desc'")
 
     try:
-        s3 = S3Service()
         response = s3.list_objects(prefix=prefix)
 
         # ファイル一覧の構築
@@ -259,7 +279,8 @@ async def list_files(
 @router.get("/storage/preview", tags=["storage"], response_model=PreviewResponse)
 async def preview_file(
     file_path: str = Query(..., description="S3キー（例: runs/1/output.json）"),
-    max_lines: int = Query(1000, ge=1, le=10000, description="最大行数")
+    max_lines: int = Query(1000, ge=1, le=10000, description="最大行数"),
+    s3: S3Service = Depends(get_s3_service)
 ):
     """
     テキストファイルの内容を取得してプレビューする
@@ -267,6 +288,7 @@ async def preview_file(
     Args:
         file_path: S3キー
         max_lines: 最大行数（デフォルト: 1000）
+        s3: S3サービス
 
     Returns:
         PreviewResponse: ファイル内容、コンテンツタイプ、サイズ等
@@ -282,24 +304,32 @@ async def preview_file(
         )
 
     try:
-        s3 = S3Service()
-        response = s3.get_object(key=file_path)
-
-        # 内容をデコード
+        # 表示するmax_lines行分の上限バイト数だけを先頭から取得
+        max_bytes = max_lines * PREVIEW_MAX_BYTES_PER_LINE
+        response = s3.get_object(key=file_path, max_bytes=max_bytes)
+        body = response['body']
+
+        # 行数制限（max_lines個目の改行までを残す。全体を行リストに分割しない）
+        end = -1
+        for _ in range(max_lines):
+            end = body.find(b'\n', end + 1)
+            if end < 0:
+                break
+        if end >= 0:
+            body = body[:end]
+        # 行数に達しないまま上限バイト数で打ち切られた場合（オブジェクト全体より短い）は切り詰め扱い
+        partial = end < 0 and len(body) < response['content_length']
+        truncated = end >= 0 or partial
+
+        # 内容をデコード（範囲の途中で切れたマルチバイト文字は除く）
         try:
-            content = response['body'].decode('utf-8')
+            content = codecs.getincrementaldecoder('utf-8')().decode(body, final=not partial)
         except UnicodeDecodeError:
             raise HTTPException(
                 status_code=415,
                 detail="File encoding is not UTF-8, cannot preview"
             )
 
-        # 行数制限
-        lines = content.split('\n')
-        truncated = len(lines) > max_lines
-        if truncated:
-            content = '\n'.join(lines[:max_lines])
-
         return PreviewResponse(
             content=content,
             content_type=content_type,
@@ -325,7 +355,8 @@ async def preview_file(
 @router.get("/storage/download", tags=["storage"], response_model=DownloadResponse)
 async def download_file(
     file_path: str = Query(..., description="S3キー（例: runs/1/output.json）"),
-    expires_in: int = Query(3600, ge=60, le=86400, description="有効期限（秒）")
+    expires_in: int = Query(3600, ge=60, le=86400, description="有効期限（秒）"),
+    s3: S3Service = Depends(get_s3_service)
 ):
     """
     ダウンロード用の事前署名URLを生成する
@@ -333,13 +364,12 @@ async def download_file(
     Args:
         file_path: S3キー
         expires_in: 有効期限（秒）、デフォルト3600秒（1時間）
+        s3: S3サービス
 
     Returns:
         DownloadResponse: 事前署名URL、有効期限
     """
     try:
-        s3 = S3Service()
-
         # ファイル存在確認
         try:
             s3.head_object(key=file_path)
@@ -349,12 +379,13 @@ async def download_file(
                 raise HTTPException(status_code=404, detail="File not found")
             raise
 
+        # 有効期限計算（URLは時間窓内で再利用されるため、窓の開始時刻から数える）
+        # URL生成より先に計算し、生成中に窓が切り替わっても実際より長く報告しないようにする
+        expires_at = datetime.utcfromtimestamp(presigned_url_window_start(expires_in)) + timedelta(seconds=expires_in)
+
         # 事前署名URL生成
         url = s3.generate_presigned_url(key=file_path, expires_in=expires_in)
 
-        # 有効期限計算
-        expires_at = datetime.utcnow() + timedelta(seconds=expires_in)
-
         return DownloadResponse(
             download_url=url,
             expires_at=expires_at.isoformat() + 'Z'
@@ -376,20 +407,20 @@ async def download_file(
 
 @router.get("/storage/download-direct", tags=["storage"])
 async def download_file_direct(
-    file_path: str = Query(..., description="ファイルパス（例: runs/1/protocol.yaml）")
+    file_path: str = Query(..., description="ファイルパス（例: runs/1/protocol.yaml）"),
+    s3: S3Service = Depends(get_s3_service)
 ):
     """
     ファイルを直接ダウンロードする（ローカルモード用）
 
     Args:
         file_path: ファイルパス
+        s3: S3サービス
 
     Returns:
         StreamingResponse: ファイルストリーム
     """
     try:
-        s3 = S3Service()
-
         # ファイル存在確認
         try:
             s3.head_object(key=file_path)
@@ -479,8 +510,10 @@ async def batch_download(
             logger.warning(f"Some runs not found: {missing_ids}")
 
         # ZIPストリームを生成
+        # 上限チェックのための一覧取得（S3 LIST）はここで完了を待つため、
+        # イベントループを塞がないようスレッドプールで実行する
         zip_service = ZipStreamService()
-        zip_stream = zip_service.create_zip_stream(runs_data)
+        zip_stream = await run_in_threadpool(zip_service.create_zip_stream, runs_data)
         filename = zip_service.generate_filename()
 
         return StreamingResponse(
@@ -3,35 +3,61 @@
 全Run対象のフォールバックポート一括生成スクリプト（インライン版）
 """
 
-from define_db.database import SessionLocal
+import sys
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from define_db.database import SQLALCHEMY_DATABASE_URL
 from define_db.models import Run, Process, Edge, Operation, Port, PortConnection
+from sqlalchemy import create_engine, func, literal, or_, select
+from sqlalchemy.orm import aliased, sessionmaker
+
+# Run単位の処理はDB往復待ちが主なため、スレッドで並列実行する
+BATCH_MAX_WORKERS = 16
+
+# SQLiteのロック待ちの上限（秒）。既定の5秒では並列実行中に "database is locked" になりうる
+SQLITE_BUSY_TIMEOUT = 30
+
+# SQLiteは同時に1接続しか書き込めないため、書き込み〜コミットはスレッド間で直列化する
+# （並列化するのは読み取りのみ）
+_write_lock = threading.Lock()
 
+# Runはこの件数ずつ読み込み、チャンク単位でスレッドプールに投入する
+RUN_CHUNK_SIZE = 500
 
-def generate_fallback_ports_for_run(session, run_id: int) -> dict:
+
+def generate_fallback_ports_for_run(session, run_id: int, edges: list = None) -> dict:
     """既存のEdgesテーブルから推測してPorts/PortConnectionsを生成"""
     run = session.query(Run).filter(Run.id == run_id).first()
     if not run:
         return {"ports_created": 0, "connections_created": 0, "skipped": True, "reason": "Run not found"}
 
-    # 既存のポートと接続をチェック
-    existing_ports = session.query(Port).join(Process).filter(
-        Process.run_id == run_id
-    ).count()
-
-    existing_connections = session.query(PortConnection).filter(
-        PortConnection.run_id == run_id
-    ).count()
+    # 既存のポートと接続をチェック（件数は不要なため、1件でもあるかをEXISTSで判定）
+    has_existing = session.execute(
+        select(literal(1)).where(or_(
+            select(Port.id).join(Process).where(Process.run_id == run_id).exists(),
+            select(PortConnection.id).where(PortConnection.run_id == run_id).exists()
+        ))
+    ).first() is not None
 
-    if existing_ports > 0 or existing_connections > 0:
+    if has_existing:
         return {
             "ports_created": 0,
             "connections_created": 0,
             "skipped": True,
-            "reason": f"Already has {existing_ports} ports and {existing_connections} connections"
+            "reason": "Already has ports or connections"
         }
 
-    # Edgesテーブルから接続情報を取得
-    edges = session.query(Edge).filter(Edge.run_id == run_id).all()
+    # Edgesテーブルから接続情報を取得（接続元・接続先のOperationを結合して1クエリで解決）
+    if edges is None:
+        FromOp = aliased(Operation)
+        ToOp = aliased(Operation)
+        edges = session.query(FromOp.process_id, ToOp.process_id).select_from(Edge).outerjoin(
+            FromOp, Edge.from_id == FromOp.id
+        ).outerjoin(
+            ToOp, Edge.to_id == ToOp.id
+        ).filter(Edge.run_id == run_id).all()
 
     if not edges:
         return {"ports_created": 0, "connections_created": 0, "skipped": True, "reason": "No edges found"}
@@ -39,12 +65,9 @@ def generate_fallback_ports_for_run(session, run_id: int) -> dict:
     # エッジから（プロセス間接続）を抽出
     process_connections = set()
 
-    for edge in edges:
-        from_op = session.query(Operation).filter(Operation.id == edge.from_id).first()
-        to_op = session.query(Operation).filter(Operation.id == edge.to_id).first()
-
-        if from_op and to_op:
-            process_connections.add((from_op.process_id, to_op.process_id))
+    for from_proc_id, to_proc_id in edges:
+        if from_proc_id is not None and to_proc_id is not None:
+            process_connections.add((from_proc_id, to_proc_id))
 
     if not process_connections:
         return {"ports_created": 0, "connections_created": 0, "skipped": True, "reason": "No valid process connections"}
@@ -52,13 +75,23 @@ def generate_fallback_ports_for_run(session, run_id: int) -> dict:
     ports_created = 0
     connections_created = 0
 
+    # 登録するポート行と、接続ごとの（出力ポート, 入力ポート）キー
+    port_rows = []
+    connection_keys = []
+
     # プロセスごとのポートカウンター
     process_output_count = {}
     process_input_count = {}
 
+    # 接続に登場するプロセスを一括取得
+    process_ids = {pid for pair in process_connections for pid in pair}
+    processes = {
+        p.id: p for p in session.query(Process).filter(Process.id.in_(process_ids)).all()
+    }
+
     for from_proc_id, to_proc_id in sorted(process_connections):
-        from_process = session.query(Process).filter(Process.id == from_proc_id).first()
-        to_process = session.query(Process).filter(Process.id == to_proc_id).first()
+        from_process = processes.get(from_proc_id)
+        to_process = processes.get(to_proc_id)
 
         if not from_process or not to_process:
             continue
@@ -68,60 +101,132 @@ def generate_fallback_ports_for_run(session, run_id: int) -> dict:
         process_output_count[from_proc_id] = output_count
         output_port_name = f"output_{output_count}" if output_count > 1 else "output"
 
-        output_port = Port(
-            process_id=from_process.id,
-            port_name=output_port_name,
-            port_type="output",
-            data_type="Unknown",
-            position=output_count - 1,
-            is_required=True,
-            default_value=None,
-            description=f"Generated output port to {to_process.name}"
-        )
+        port_rows.append({
+            "process_id": from_process.id,
+            "port_name": output_port_name,
+            "port_type": "output",
+            "data_type": "Unknown",
+            "position": output_count - 1,
+            "is_required": True,
+            "default_value": None,
+            "description": f"Generated output port to {to_process.name}"
+        })
 
         # 入力ポート作成
         input_count = process_input_count.get(to_proc_id, 0) + 1
         process_input_count[to_proc_id] = input_count
         input_port_name = f"input_{input_count}" if input_count > 1 else "input"
 
-        input_port = Port(
-            process_id=to_process.id,
-            port_name=input_port_name,
-            port_type="input",
-            data_type="Unknown",
-            position=input_count - 1,
-            is_required=True,
-            default_value=None,
-            description=f"Generated input port from {from_process.name}"
+        port_rows.append({
+            "process_id": to_process.id,
+            "port_name": input_port_name,
+            "port_type": "input",
+            "data_type": "Unknown",
+            "position": input_count - 1,
+            "is_required": True,
+            "default_value": None,
+            "description": f"Generated input port from {from_process.name}"
+        })
+
+        connection_keys.append(
+            ((from_process.id, output_port_name), (to_process.id, input_port_name))
         )
 
-        session.add(output_port)
-        session.add(input_port)
-        session.flush()
-
-        # PortConnection 作成
-        connection = PortConnection(
-            run_id=run_id,
-            source_port_id=output_port.id,
-            target_port_id=input_port.id
-        )
-        session.add(connection)
-
         ports_created += 2
         connections_created += 1
 
-    session.commit()
+    with _write_lock:
+        if port_rows:
+            # ポートを一括登録し、採番されたIDを1クエリで取得
+            session.bulk_insert_mappings(Port, port_rows)
+            port_ids = {
+                (process_id, port_name): port_id
+                for port_id, process_id, port_name in session.query(
+                    Port.id, Port.process_id, Port.port_name
+                ).filter(
+                    Port.process_id.in_({row["process_id"] for row in port_rows}),
+                    Port.port_name.in_({row["port_name"] for row in port_rows})
+                )
+            }
+
+            # PortConnection 一括作成
+            session.bulk_insert_mappings(PortConnection, [
+                {
+                    "run_id": run_id,
+                    "source_port_id": port_ids[source_key],
+                    "target_port_id": port_ids[target_key]
+                }
+                for source_key, target_key in connection_keys
+            ])
+
+        session.commit()
 
     return {"ports_created": ports_created, "connections_created": connections_created, "skipped": False, "reason": "Success"}
 
 
+def create_batch_engine():
+    """
+    このスクリプト専用のDBエンジンを作成する
+
+    アプリ共有のengineの接続プール設定は変えずに、並列ワーカーとメインセッションの分の
+    接続を確保する。ロック待ちはSQLITE_BUSY_TIMEOUT秒まで許容する。
+    """
+    return create_engine(
+        SQLALCHEMY_DATABASE_URL,
+        connect_args={"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT},
+        pool_size=BATCH_MAX_WORKERS + 1,
+        max_overflow=0
+    )
+
+
+def process_one(session_factory, run_id: int, edges: list) -> dict:
+    """1件のRunを個別のセッションで処理する（エラーの影響を最小化）"""
+    with session_factory() as run_session:
+        return generate_fallback_ports_for_run(run_session, run_id, edges=edges)
+
+
+def iter_run_chunks(session, chunk_size: int = RUN_CHUNK_SIZE):
+    """
+    削除されていないRunの (id, file_name) をID順にチャンク単位で取得する
+
+    全Runを一度に読み込まず、メモリ上にはチャンク分のみを保持する。
+    読み取りカーソルを開いたままにするとSQLiteでは並列ワーカーのコミットが
+    ロック待ちになるため、チャンクごとにクエリを完結させる（IDによるキーセット方式）。
+
+    Args:
+        session: SQLAlchemy session
+        chunk_size: 1チャンクあたりのRun数
+
+    Yields:
+        list: (id, file_name) の行のリスト
+    """
+    last_id = None
+    while True:
+        query = session.query(Run.id, Run.file_name).filter(Run.deleted_at.is_(None))
+        if last_id is not None:
+            query = query.filter(Run.id > last_id)
+        chunk = query.order_by(Run.id).limit(chunk_size).all()
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1].id
+
+
 def batch_generate_ports():
     """ポート情報がない全Runに対して一括生成"""
-    with SessionLocal() as session:
-        # 削除されていないすべてのRunを取得
-        runs = session.query(Run).filter(Run.deleted_at.is_(None)).all()
-
-        total_runs = len(runs)
+    engine = create_batch_engine()
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    try:
+        _batch_generate_ports(session_factory)
+    finally:
+        engine.dispose()
+
+
+def _batch_generate_ports(session_factory):
+    """batch_generate_portsの本体（session_factoryでメイン・Run単位のセッションを開く）"""
+    with session_factory() as session:
+        # 削除されていないRunの件数（Run自体はチャンク単位で逐次取得する）
+        total_runs = session.query(func.count(Run.id)).filter(Run.deleted_at.is_(None)).scalar()
         processed = 0
         skipped = 0
         total_ports = 0
@@ -132,23 +237,62 @@ def batch_generate_ports():
         print(f"{'='*60}")
         print(f"Found {total_runs} runs to process\n")
 
-        for run in runs:
-            try:
-                with SessionLocal() as run_session:
-                    result = generate_fallback_ports_for_run(run_session, run.id)
+        # ポート・接続が既にあるRunを一括で特定（該当Runはセッションを開かずにスキップ）
+        runs_with_ports = {r for (r,) in session.query(Process.run_id).join(Port).distinct()}
+        runs_with_conns = {r for (r,) in session.query(PortConnection.run_id).distinct()}
+
+        # 全Runのエッジを (from_process_id, to_process_id) として一括取得
+        FromOp = aliased(Operation)
+        ToOp = aliased(Operation)
+        edges_by_run = defaultdict(list)
+        for run_id, from_proc_id, to_proc_id in session.query(
+            Edge.run_id, FromOp.process_id, ToOp.process_id
+        ).select_from(Edge).outerjoin(
+            FromOp, Edge.from_id == FromOp.id
+        ).outerjoin(
+            ToOp, Edge.to_id == ToOp.id
+        ):
+            edges_by_run[run_id].append((from_proc_id, to_proc_id))
+
+        # Runはチャンク単位で取得し、各Runを個別のセッションで並列処理する
+        # 結果はRunの順に、チャンクごとにまとめて出力する（1行ごとのprint・flushを避ける）
+        with ThreadPoolExecutor(max_workers=BATCH_MAX_WORKERS) as executor:
+            for chunk in iter_run_chunks(session):
+                tasks = []
+                for run in chunk:
+                    if run.id in runs_with_ports or run.id in runs_with_conns:
+                        tasks.append((run, "Already has ports or connections"))
+                    else:
+                        tasks.append((run, executor.submit(
+                            process_one, session_factory, run.id, edges_by_run.get(run.id, [])
+                        )))
+
+                lines = []
+                for run, task in tasks:
+                    label = f"Run {run.id:3d} ({run.file_name:20s})"
+                    if isinstance(task, str):
+                        lines.append(f"{label}: ⏭️  {task}\n")
+                        skipped += 1
+                        continue
+
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        lines.append(f"{label}: ❌ Error: {e}\n")
+                        skipped += 1
+                        continue
 
                     if result["skipped"]:
-                        print(f"Run {run.id:3d} ({run.file_name:20s}): ⏭️  {result['reason']}")
+                        lines.append(f"{label}: ⏭️  {result['reason']}\n")
                         skipped += 1
                     else:
-                        print(f"Run {run.id:3d} ({run.file_name:20s}): ✅ Created {result['ports_created']} ports, {result['connections_created']} connections")
+                        lines.append(f"{label}: ✅ Created {result['ports_created']} ports, {result['connections_created']} connections\n")
                         processed += 1
                         total_ports += result["ports_created"]
                         total_connections += result["connections_created"]
 
-            except Exception as e:
-                print(f"Run {run.id:3d} ({run.file_name:20s}): ❌ Error: {e}")
-                skipped += 1
+                sys.stdout.write("".join(lines))
+                sys.stdout.flush()
 
         print(f"\n{'='*60}")
         print(f"Summary:")
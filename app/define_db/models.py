@@ -80,7 +80,8 @@ class Run(Base):
         nullable=True,
     )
     status: Mapped[str] = mapped_column(String(10))
-    storage_address: Mapped[str] = mapped_column(String(256))
+    # 前方一致検索（Google Drive URLの移行等）で範囲スキャンできるようインデックスを張る
+    storage_address: Mapped[str] = mapped_column(String(256), index=True)
     # ★追加: ストレージモード
     storage_mode: Mapped[str] = mapped_column(
         String(10),
@@ -5,6 +5,8 @@ Inline version of generate_fallback_ports.py that runs from /app directory
 
 from define_db.database import SessionLocal
 from define_db.models import Run, Process, Edge, Operation, Port, PortConnection
+from sqlalchemy import literal, or_, select
+from sqlalchemy.orm import aliased
 
 def generate_fallback_ports_for_run(run_id: int):
     """Generate fallback ports from edges"""
@@ -16,22 +18,27 @@ def generate_fallback_ports_for_run(run_id: int):
 
         print(f"Processing Run {run.id}: {run.file_name}")
 
-        # 既存のポートと接続をチェック
-        existing_ports = session.query(Port).join(Process).filter(
-            Process.run_id == run_id
-        ).count()
+        # 既存のポートと接続をチェック（件数は不要なため、1件でもあるかをEXISTSで判定）
+        has_existing = session.execute(
+            select(literal(1)).where(or_(
+                select(Port.id).join(Process).where(Process.run_id == run_id).exists(),
+                select(PortConnection.id).where(PortConnection.run_id == run_id).exists()
+            ))
+        ).first() is not None
 
-        existing_connections = session.query(PortConnection).filter(
-            PortConnection.run_id == run_id
-        ).count()
-
-        if existing_ports > 0 or existing_connections > 0:
-            print(f"⚠️  Run {run_id} already has {existing_ports} ports and {existing_connections} connections.")
+        if has_existing:
+            print(f"⚠️  Run {run_id} already has ports or connections.")
             print(f"   Skipping to avoid duplication.")
             return {"ports_created": 0, "connections_created": 0}
 
-        # Edgesテーブルから接続情報を取得
-        edges = session.query(Edge).filter(Edge.run_id == run_id).all()
+        # Edgesテーブルから接続情報を取得（接続元・接続先のOperationを結合して1クエリで解決）
+        FromOp = aliased(Operation)
+        ToOp = aliased(Operation)
+        edges = session.query(FromOp.process_id, ToOp.process_id).select_from(Edge).outerjoin(
+            FromOp, Edge.from_id == FromOp.id
+        ).outerjoin(
+            ToOp, Edge.to_id == ToOp.id
+        ).filter(Edge.run_id == run_id).all()
 
         if not edges:
             print(f"⚠️  No edges found for Run {run_id}. Nothing to generate.")
@@ -42,25 +49,32 @@ def generate_fallback_ports_for_run(run_id: int):
         # エッジから（プロセス間接続）を抽出
         process_connections = set()
 
-        for edge in edges:
-            from_op = session.query(Operation).filter(Operation.id == edge.from_id).first()
-            to_op = session.query(Operation).filter(Operation.id == edge.to_id).first()
-
-            if from_op and to_op:
-                process_connections.add((from_op.process_id, to_op.process_id))
+        for from_proc_id, to_proc_id in edges:
+            if from_proc_id is not None and to_proc_id is not None:
+                process_connections.add((from_proc_id, to_proc_id))
 
         print(f"Identified {len(process_connections)} unique process-to-process connections")
 
         ports_created = 0
         connections_created = 0
 
+        # 登録するポート行と、接続ごとの（出力ポート, 入力ポート）キー
+        port_rows = []
+        connection_keys = []
+
         # プロセスごとのポートカウンター
         process_output_count = {}
         process_input_count = {}
 
+        # 接続に登場するプロセスを一括取得
+        process_ids = {pid for pair in process_connections for pid in pair}
+        processes = {
+            p.id: p for p in session.query(Process).filter(Process.id.in_(process_ids)).all()
+        }
+
         for from_proc_id, to_proc_id in sorted(process_connections):
-            from_process = session.query(Process).filter(Process.id == from_proc_id).first()
-            to_process = session.query(Process).filter(Process.id == to_proc_id).first()
+            from_process = processes.get(from_proc_id)
+            to_process = processes.get(to_proc_id)
 
             if not from_process or not to_process:
                 continue
@@ -71,16 +85,16 @@ def generate_fallback_ports_for_run(run_id: int):
 
             output_port_name = f"output_{output_count}" if output_count > 1 else "output"
 
-            output_port = Port(
-                process_id=from_process.id,
-                port_name=output_port_name,
-                port_type="output",
-                data_type="Unknown",
-                position=output_count - 1,
-                is_required=True,
-                default_value=None,
-                description=f"Generated output port to {to_process.name}"
-            )
+            port_rows.append({
+                "process_id": from_process.id,
+                "port_name": output_port_name,
+                "port_type": "output",
+                "data_type": "Unknown",
+                "position": output_count - 1,
+                "is_required": True,
+                "default_value": None,
+                "description": f"Generated output port to {to_process.name}"
+            })
 
             # 入力ポート作成
             input_count = process_input_count.get(to_proc_id, 0) + 1
@@ -88,34 +102,49 @@ def generate_fallback_ports_for_run(run_id: int):
 
             input_port_name = f"input_{input_count}" if input_count > 1 else "input"
 
-            input_port = Port(
-                process_id=to_process.id,
-                port_name=input_port_name,
-                port_type="input",
-                data_type="Unknown",
-                position=input_count - 1,
-                is_required=True,
-                default_value=None,
-                description=f"Generated input port from {from_process.name}"
+            port_rows.append({
+                "process_id": to_process.id,
+                "port_name": input_port_name,
+                "port_type": "input",
+                "data_type": "Unknown",
+                "position": input_count - 1,
+                "is_required": True,
+                "default_value": None,
+                "description": f"Generated input port from {from_process.name}"
+            })
+
+            connection_keys.append(
+                ((from_process.id, output_port_name), (to_process.id, input_port_name))
             )
 
-            session.add(output_port)
-            session.add(input_port)
-            session.flush()
-
-            # PortConnection 作成
-            connection = PortConnection(
-                run_id=run_id,
-                source_port_id=output_port.id,
-                target_port_id=input_port.id
-            )
-            session.add(connection)
-
             ports_created += 2
             connections_created += 1
 
             print(f"  ✅ Created: {from_process.name}.{output_port_name} -> {to_process.name}.{input_port_name}")
 
+        if port_rows:
+            # ポートを一括登録し、採番されたIDを1クエリで取得
+            session.bulk_insert_mappings(Port, port_rows)
+            port_ids = {
+                (process_id, port_name): port_id
+                for port_id, process_id, port_name in session.query(
+                    Port.id, Port.process_id, Port.port_name
+                ).filter(
+                    Port.process_id.in_({row["process_id"] for row in port_rows}),
+                    Port.port_name.in_({row["port_name"] for row in port_rows})
+                )
+            }
+
+            # PortConnection 一括作成
+            session.bulk_insert_mappings(PortConnection, [
+                {
+                    "run_id": run_id,
+                    "source_port_id": port_ids[source_key],
+                    "target_port_id": port_ids[target_key]
+                }
+                for source_key, target_key in connection_keys
+            ])
+
         session.commit()
         print(f"\n✅ Successfully created {ports_created} ports and {connections_created} connections for Run {run_id}")
 
@@ -46,6 +46,12 @@ MIGRATIONS = [
         "check": "SELECT 1 FROM pragma_table_info('runs') WHERE name='display_visible'",
         "sql": "ALTER TABLE runs ADD COLUMN display_visible BOOLEAN DEFAULT 1 NOT NULL"
     },
+    {
+        "version": "004",
+        "description": "Ensure storage_address index in runs",
+        "check": "SELECT 1 FROM pragma_index_list('runs') WHERE name='ix_runs_storage_address'",
+        "sql": "CREATE INDEX IF NOT EXISTS ix_runs_storage_address ON runs (storage_address)"
+    },
 ]
 
 
@@ -22,12 +22,19 @@ from pathlib import Path
 # プロジェクトルートをパスに追加
 sys.path.insert(0, '/app')
 
-from define_db.database import SessionLocal
-from define_db.models import Run
+# SQLAlchemy・DB・モデルは実行時に関数内で読み込む
+# （SQLAlchemyの読み込みを待たずに --help や引数エラーを返すため）
+
+# 移行対象のstorage_addressの接頭辞
+DRIVE_URL_PREFIX = 'https://drive.google.com'
 
 
 def migrate_storage_address(dry_run: bool = False):
     """Google Drive URLをS3パスに移行"""
+    from sqlalchemy import String, and_, cast, func, literal, update
+
+    from define_db.database import SessionLocal
+    from define_db.models import Run
 
     print("=" * 60)
     print("Storage Address Migration: Google Drive URL → S3 Path")
@@ -35,39 +42,50 @@ def migrate_storage_address(dry_run: bool = False):
 
     with SessionLocal() as session:
         # Google Drive URLを持つRunを検索
-        runs_with_url = session.query(Run).filter(
-            Run.storage_address.like('https://drive.google.com%')
-        ).all()
-
-        print(f"\n対象レコード数: {len(runs_with_url)}")
-
-        if not runs_with_url:
+        # LIKE 'prefix%' はSQLiteでは大文字小文字を区別しないためインデックスを使えない。
+        # 同じ前方一致を [prefix, prefix末尾の文字+1) の範囲条件で表し、
+        # ix_runs_storage_address の範囲スキャン（id含めインデックスのみ）で済ませる
+        prefix_end = DRIVE_URL_PREFIX[:-1] + chr(ord(DRIVE_URL_PREFIX[-1]) + 1)
+        is_drive_url = and_(
+            Run.storage_address >= DRIVE_URL_PREFIX,
+            Run.storage_address < prefix_end
+        )
+        target_count = session.query(func.count(Run.id)).filter(is_drive_url).scalar()
+
+        print(f"\n対象レコード数: {target_count}")
+
+        if not target_count:
             print("✅ 移行対象のレコードはありません。")
             return
 
         print("\n移行対象:")
         print("-" * 60)
 
-        for run in runs_with_url:
-            old_value = run.storage_address
-            new_value = f"runs/{run.id}/"
+        # 表示用にはIDと旧値のみを逐次取得（ORMオブジェクトは生成しない）
+        for run_id, old_value in session.query(Run.id, Run.storage_address).filter(
+            is_drive_url
+        ).yield_per(500):
+            new_value = f"runs/{run_id}/"
 
-            print(f"  Run ID: {run.id}")
+            print(f"  Run ID: {run_id}")
             print(f"    旧: {old_value[:50]}...")
             print(f"    新: {new_value}")
             print()
 
-            if not dry_run:
-                run.storage_address = new_value
-
         if dry_run:
             print("-" * 60)
             print("🔍 [DRY RUN] 実際の更新は行われませんでした。")
             print("    実行するには --dry-run オプションを外してください。")
         else:
+            # 新しい値はIDから決まるため、1回のUPDATEでDB側で一括変換
+            result = session.execute(
+                update(Run).where(is_drive_url).values(
+                    storage_address=literal('runs/') + cast(Run.id, String) + '/'
+                )
+            )
             session.commit()
             print("-" * 60)
-            print(f"✅ {len(runs_with_url)} 件のレコードを更新しました。")
+            print(f"✅ {result.rowcount} 件のレコードを更新しました。")
 
         print("=" * 60)
 
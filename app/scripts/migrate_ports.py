@@ -15,22 +15,91 @@
     docker exec -it <container_id> python /app/scripts/migrate_ports.py --dry-run
 """
 
+import os
 import sys
 from pathlib import Path
 
 # app ディレクトリをパスに追加
 sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
 
-from define_db.database import SessionLocal
-from define_db.models import Run
-from services.yaml_importer import YAMLPortImporter
 import argparse
 
+# DB・モデル・インポーターは実行時に関数内で読み込む
+# （SQLAlchemyの読み込みを待たずに --help や引数エラーを返すため）
+
+# 移行に必要なYAMLファイル
+YAML_FILE_NAMES = ("protocol.yaml", "manipulate.yaml")
+
+# 全Run移行時にRunを読み込む件数の単位
+RUN_CHUNK_SIZE = 500
+
+
+def has_yaml_files(storage_address: str, dir_entries: dict) -> bool:
+    """
+    storage_address直下に移行に必要なYAMLファイルが揃っているか確認
+
+    ディレクトリごとに1回だけlistdirし、結果をdir_entriesにキャッシュする
+    （ファイルごとのstatを避け、同じディレクトリを共有するRunでは再読み込みしない）。
+
+    Args:
+        storage_address: Runのストレージパス
+        dir_entries: ディレクトリ -> エントリ名集合 のキャッシュ
+
+    Returns:
+        bool: protocol.yaml と manipulate.yaml が両方存在する場合True
+    """
+    directory = Path(storage_address)
+    entries = dir_entries.get(directory)
+    if entries is None:
+        try:
+            entries = set(os.listdir(directory))
+        except (FileNotFoundError, NotADirectoryError):
+            entries = set()
+        dir_entries[directory] = entries
+    return all(name in entries for name in YAML_FILE_NAMES)
+
+
+def iter_runs(session, chunk_size: int = RUN_CHUNK_SIZE):
+    """
+    削除されていないRunの (id, file_name, storage_address) をID順に逐次取得する
+
+    全Runを一度に読み込まず、メモリ上にはチャンク分のみを保持する。
+    移行処理は同じセッションでコミットするため、読み取りカーソルを開いたままにせず
+    チャンクごとにクエリを完結させる（IDによるキーセット方式）。
+
+    Args:
+        session: SQLAlchemy session
+        chunk_size: 1回のクエリで取得するRun数
+
+    Yields:
+        (id, file_name, storage_address) の行
+    """
+    from define_db.models import Run
+
+    last_id = None
+    while True:
+        query = session.query(Run.id, Run.file_name, Run.storage_address).filter(
+            Run.deleted_at.is_(None)
+        )
+        if last_id is not None:
+            query = query.filter(Run.id > last_id)
+        chunk = query.order_by(Run.id).limit(chunk_size).all()
+        if not chunk:
+            return
+        yield from chunk
+        last_id = chunk[-1].id
+
 
 def migrate_all_runs(dry_run: bool = False):
     """全Runのポート情報をマイグレーション（冪等性対応）"""
+    from define_db.database import SessionLocal
+    from define_db.models import Run
+    from services.yaml_importer import YAMLPortImporter
+    from sqlalchemy import func
+
     with SessionLocal() as session:
-        runs = session.query(Run).filter(Run.deleted_at.is_(None)).all()
+        # 件数のみ先に取得し、Run自体はチャンク単位で逐次取得する
+        total_runs = session.query(func.count(Run.id)).filter(Run.deleted_at.is_(None)).scalar()
 
         total_ports_created = 0
         total_ports_skipped = 0
@@ -38,9 +107,11 @@ def migrate_all_runs(dry_run: bool = False):
         total_connections_skipped = 0
         run_skipped_count = 0
 
-        print(f"Found {len(runs)} runs to process.\n")
+        print(f"Found {total_runs} runs to process.\n")
 
-        for run in runs:
+        dir_entries = {}
+
+        for run in iter_runs(session):
             print(f"Processing Run {run.id}: {run.file_name}")
 
             # storage_addressがGoogle Drive URLの場合はスキップ
@@ -50,10 +121,7 @@ def migrate_all_runs(dry_run: bool = False):
                 continue
 
             # YAMLファイル存在確認
-            protocol_path = Path(run.storage_address) / "protocol.yaml"
-            manipulate_path = Path(run.storage_address) / "manipulate.yaml"
-
-            if not protocol_path.exists() or not manipulate_path.exists():
+            if not has_yaml_files(run.storage_address, dir_entries):
                 print(f"  ⏭️  Skipping (YAML not found): {run.storage_address}")
                 run_skipped_count += 1
                 continue
@@ -64,7 +132,11 @@ def migrate_all_runs(dry_run: bool = False):
 
             try:
                 importer = YAMLPortImporter(session)
-                result = importer.import_from_run(run.id, run.storage_address)
+                # 存在確認済みのローカルファイルを開き、ストリームから直接解析する
+                directory = Path(run.storage_address)
+                with open(directory / "protocol.yaml", "rb") as protocol_fp, \
+                        open(directory / "manipulate.yaml", "rb") as manipulate_fp:
+                    result = importer.import_from_streams(run.id, protocol_fp, manipulate_fp)
                 total_ports_created += result['ports_created']
                 total_ports_skipped += result['ports_skipped']
                 total_connections_created += result['connections_created']
@@ -80,8 +152,8 @@ def migrate_all_runs(dry_run: bool = False):
                 print(f"  ❌ Error: {e}")
 
         print(f"\n{'[DRY RUN] ' if dry_run else ''}Summary:")
-        print(f"  Total Runs: {len(runs)}")
-        print(f"  Processed: {len(runs) - run_skipped_count}")
+        print(f"  Total Runs: {total_runs}")
+        print(f"  Processed: {total_runs - run_skipped_count}")
         print(f"  Skipped (no YAML/remote): {run_skipped_count}")
         if not dry_run:
             print(f"  Ports: {total_ports_created} created, {total_ports_skipped} skipped")
@@ -92,6 +164,10 @@ def migrate_all_runs(dry_run: bool = False):
 
 def migrate_single_run(run_id: int, dry_run: bool = False):
     """特定のRunのポート情報をマイグレーション（冪等性対応）"""
+    from define_db.database import SessionLocal
+    from define_db.models import Run
+    from services.yaml_importer import YAMLPortImporter
+
     with SessionLocal() as session:
         run = session.query(Run).filter(Run.id == run_id).first()
         if not run:
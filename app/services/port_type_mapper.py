@@ -23,7 +23,10 @@ class PortTypeMapper:
                                  Noneの場合、デフォルトパスを使用
         """
         self.process_port_map: Dict[str, Dict] = {}
+        # (process_type, port_direction) → {port_name: data_type} の索引
+        self._port_type_index: Dict[tuple, Dict[str, str]] = {}
         self._load_manipulate_yaml(manipulate_yaml_path)
+        self._build_port_type_index()
 
     def _load_manipulate_yaml(self, yaml_path: Optional[str] = None):
         """manipulate.yamlから型定義を読み込み"""
@@ -65,6 +68,15 @@ class PortTypeMapper:
         except Exception as e:
             logger.error(f"Failed to load manipulate.yaml from {yaml_path}: {e}")
 
+    def _build_port_type_index(self):
+        """ポート名から型を引く索引を構築（同名ポートは先頭の定義を優先）"""
+        self._port_type_index = {}
+        for process_type, directions in self.process_port_map.items():
+            for port_direction, ports in directions.items():
+                index = self._port_type_index.setdefault((process_type, port_direction), {})
+                for port_def in ports or []:
+                    index.setdefault(port_def.get('id'), port_def.get('type', 'Unknown'))
+
     def get_port_type(self, process_type: str, port_name: str, port_direction: str) -> str:
         """
         指定されたProcess Type, Port Name, Port Direction (input/output) からデータ型を取得
@@ -78,16 +90,11 @@ class PortTypeMapper:
             データ型文字列 (例: "Plate96", "Integer", "SpotArray | Plate96")
             見つからない場合は "Unknown"
         """
-        if process_type not in self.process_port_map:
+        index = self._port_type_index.get((process_type, port_direction))
+        if index is None:
             return "Unknown"
 
-        ports = self.process_port_map[process_type].get(port_direction, [])
-
-        for port_def in ports:
-            if port_def.get('id') == port_name:
-                return port_def.get('type', 'Unknown')
-
-        return "Unknown"
+        return index.get(port_name, "Unknown")
 
     def get_all_ports_for_process(self, process_type: str) -> Optional[Dict]:
         """
@@ -12,15 +12,49 @@ S3バケットへのアクセスを抽象化し、以下の機能を提供する
 """
 
 import os
+import time
 from typing import Optional, List, Generator, Tuple
 from datetime import datetime, timedelta
 from botocore.exceptions import ClientError
 import logging
 
 from services.storage_service import get_storage, StorageService
+from services.storage.cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+# ストリーミング取得のチャンクサイズ
+# 小さすぎると読み込み・圧縮呼び出しの回数が増えるため1MB単位で取得する
+STREAM_CHUNK_SIZE = 1024 * 1024  # 1MB
+
+# 事前署名URLキャッシュの最大エントリ数
+# 署名のたびにbotocoreのエンドポイント解決が走り、URLも毎回変わってブラウザ/CDNの
+# キャッシュが効かないため、有効期間の半分までは同じURLを払い出す
+PRESIGNED_URL_CACHE_MAX_ENTRIES = 4096
+
+# (ストレージモード, バケット名, キー, 有効期限, 時間窓の開始時刻) -> 事前署名URL（S3Service.cache_scope参照）
+# 有効期間は時間窓をキーに含めて管理するためTTLは設けない
+# StorageService.reset_instance() で他のストレージキャッシュとともに破棄される
+_presigned_url_cache = TTLCache(None, PRESIGNED_URL_CACHE_MAX_ENTRIES)
+
+
+def presigned_url_window_start(expires_in: int) -> float:
+    """
+    事前署名URLを共有する時間窓の開始時刻を取得する
+
+    有効期間の半分ごとに時間窓を区切り、同じ窓の中では同じURLを再利用する。
+    URLは窓の開始以降に署名されるため、払い出し時点で常に有効期間の50%以上が残る。
+
+    Args:
+        expires_in: 有効期限（秒）
+
+    Returns:
+        float: 時間窓の開始時刻（UNIX時刻）
+    """
+    span = max(expires_in // 2, 1)
+    now = time.time()
+    return now - now % span
+
 
 class S3Service:
     """
@@ -56,20 +90,26 @@ class S3Service:
         """
         return self._storage.list_objects_with_dirs(prefix, delimiter)
 
-    def get_object(self, key: str) -> dict:
+    def get_object(self, key: str, max_bytes: Optional[int] = None) -> dict:
         """
         オブジェクトを取得する
 
         Args:
             key: S3キー
+            max_bytes: 取得する最大バイト数（先頭から。Noneの場合は全体）
+                S3ではRangeリクエストとなり、残りの部分は転送されない
 
         Returns:
             dict: {'body': bytes, 'content_length': int, 'last_modified': datetime}
+                content_lengthはmax_bytes指定時もオブジェクト全体のサイズ
 
         Raises:
             ClientError: S3アクセスエラー（NoSuchKey含む）
         """
-        content = self._storage.load(key)
+        if max_bytes is None:
+            content = self._storage.load(key)
+        else:
+            content = self._storage.load_range(key, 0, max_bytes)
         if content is None:
             # ClientErrorを模倣してNoSuchKeyエラーを発生
             from botocore.exceptions import ClientError
@@ -125,8 +165,24 @@ class S3Service:
 
         Returns:
             str: 事前署名URL（ローカルモードではNone）
+
+        Note:
+            同じキー・有効期限のURLは presigned_url_window_start() の時間窓内で再利用する
         """
+        cache_key = (
+            *self.cache_scope,
+            key,
+            expires_in,
+            presigned_url_window_start(expires_in)
+        )
+        url = _presigned_url_cache.get(cache_key)
+        if url is not None:
+            return url
+
         url = self._storage.generate_presigned_url(key, expires_in)
+        if url is not None:
+            # 署名に失敗した結果（None）はキャッシュしない
+            _presigned_url_cache.put(cache_key, url)
         if url is None and self._storage.mode == 'local':
             # ローカルモードでは直接ダウンロードAPIを使用する必要がある
             logger.warning(f"Presigned URL not available in local mode for: {key}")
@@ -138,6 +194,10 @@ class S3Service:
         """
         指定プレフィックス配下の全オブジェクトを再帰的に取得する
 
+        ページングは逐次に行い、サブプレフィックスの並列列挙はしない。
+        呼び出し側（ZipStreamService）がプレフィックス単位で既に並列化しているため、
+        ここでさらにスレッドを増やすとS3の接続プールを超えてしまう。
+
         Args:
             prefix: S3プレフィックス（例: runs/1/）
 
@@ -148,7 +208,34 @@ class S3Service:
         Raises:
             ClientError: S3アクセスエラー
         """
-        return self._storage.list_objects(prefix)
+        return list(self._storage.iter_objects(prefix))
+
+    @property
+    def cache_scope(self) -> Tuple[str, str]:
+        """
+        キャッシュキーに含める接続先を取得する
+
+        モードやバケットの切り替え後に、別の接続先で取得した結果を返さないために使用する。
+
+        Returns:
+            Tuple[str, str]: (ストレージモード, バケット名またはローカルのベースパス)
+        """
+        config = self._storage.config
+        if self._storage.mode == 's3':
+            return self._storage.mode, config.s3.bucket_name
+        return self._storage.mode, str(config.local.base_path)
+
+    @property
+    def max_pool_connections(self) -> Optional[int]:
+        """
+        S3クライアントの最大同時接続数を取得する
+
+        Returns:
+            Optional[int]: S3モードでは接続プールの上限、ローカルモードではNone
+        """
+        if self._storage.mode != 's3':
+            return None
+        return self._storage.config.s3.max_pool_connections
 
     def get_object_stream(self, key: str) -> Generator[bytes, None, None]:
         """
@@ -158,12 +245,28 @@ class S3Service:
             key: S3キー
 
         Yields:
-            bytes: ファイルチャンク（64KB単位）
+            bytes: ファイルチャンク（STREAM_CHUNK_SIZE単位）
+
+        Raises:
+            ClientError: S3アクセスエラー
+        """
+        return self._storage.load_stream(key, chunk_size=STREAM_CHUNK_SIZE)
+
+    def get_object_stream_into(self, key: str, buffer: bytearray) -> Generator[memoryview, None, None]:
+        """
+        バッファを再利用してオブジェクトをストリーミングで取得する
+
+        Args:
+            key: S3キー
+            buffer: 読み込み先バッファ（サイズがチャンクサイズとなる）
+
+        Yields:
+            memoryview: 読み込んだ範囲のビュー（次のチャンク取得時に上書きされる）
 
         Raises:
             ClientError: S3アクセスエラー
         """
-        return self._storage.load_stream(key, chunk_size=64 * 1024)
+        return self._storage.load_stream_into(key, buffer)
 
     def get_objects_batch(
         self,
@@ -5,7 +5,8 @@
 """
 
 from abc import ABC, abstractmethod
-from typing import List, Optional, Generator, Dict, Any
+from contextlib import contextmanager
+from typing import List, Optional, Generator, Dict, Any, Iterator, Union
 
 
 class StorageBackend(ABC):
@@ -26,6 +27,23 @@ class StorageBackend(ABC):
         """
         pass
 
+    @contextmanager
+    def load_mapped(self, path: str) -> Iterator[Optional[Union[bytes, memoryview]]]:
+        """
+        ファイル内容をコピーせずに参照する（withブロック内でのみ有効）
+
+        解析・ハッシュ計算など、内容をその場で読み捨てる用途向け。
+        ブロックを抜けるとマッピングは解放されるため、ビューを外に持ち出さないこと。
+        デフォルト実装はloadの結果を渡す（バックエンドで最適化可能）。
+
+        Args:
+            path: ファイルパス
+
+        Yields:
+            Optional[Union[bytes, memoryview]]: ファイル内容（bytes互換）、存在しない場合はNone
+        """
+        yield self.load(path)
+
     @abstractmethod
     def load_stream(self, path: str, chunk_size: int = 65536) -> Generator[bytes, None, None]:
         """
@@ -40,6 +58,45 @@ class StorageBackend(ABC):
         """
         pass
 
+    def load_stream_into(self, path: str, buffer: bytearray) -> Generator[memoryview, None, None]:
+        """
+        呼び出し側のバッファを再利用してファイルをストリーミング読み込みする
+
+        チャンクごとのbytes生成を避けるため、bufferに読み込んだ範囲の
+        memoryviewを返す。返されたビューは次のチャンク取得時に上書きされるため、
+        保持する場合は呼び出し側でコピーすること。
+        デフォルト実装はload_streamを使用（バックエンドで最適化可能）。
+
+        Args:
+            path: ファイルパス
+            buffer: 読み込み先バッファ（サイズがチャンクサイズとなる）
+
+        Yields:
+            memoryview: 読み込んだ範囲のビュー（またはbytes）
+        """
+        yield from self.load_stream(path, len(buffer))
+
+    def load_range(self, path: str, start: int, length: int) -> Optional[bytes]:
+        """
+        ファイルの指定範囲のみを読み込む
+
+        プレビュー等、先頭の一部だけが必要な場合に全体の転送を避ける。
+        デフォルト実装はloadの結果を切り出す（バックエンドで最適化可能）。
+
+        Args:
+            path: ファイルパス
+            start: 開始オフセット（バイト）
+            length: 最大読み込みバイト数
+
+        Returns:
+            Optional[bytes]: 範囲の内容（ファイル末尾を超える部分は含まない）、
+                存在しない場合はNone
+        """
+        content = self.load(path)
+        if content is None:
+            return None
+        return bytes(content[start:start + length])
+
     @abstractmethod
     def list_objects(self, prefix: str) -> List[Dict[str, Any]]:
         """
@@ -54,6 +111,37 @@ class StorageBackend(ABC):
         """
         pass
 
+    def iter_objects(self, prefix: str) -> Generator[Dict[str, Any], None, None]:
+        """
+        指定プレフィックス配下のオブジェクトを逐次列挙する
+
+        全件をリストに保持しないため、件数の多いプレフィックスや
+        途中で打ち切る走査に向く。デフォルト実装はlist_objectsを使用。
+
+        Args:
+            prefix: プレフィックス
+
+        Yields:
+            Dict: {'Key': str, 'Size': int, 'LastModified': datetime}
+        """
+        yield from self.list_objects(prefix)
+
+    def iter_sizes(self, prefix: str) -> Generator[int, None, None]:
+        """
+        指定プレフィックス配下のオブジェクトサイズのみを列挙する
+
+        合計サイズ計算など、サイズ以外の情報が不要な場合に使用する。
+        デフォルト実装はiter_objectsを使用（バックエンドで最適化可能）。
+
+        Args:
+            prefix: プレフィックス
+
+        Yields:
+            int: オブジェクトサイズ（バイト）
+        """
+        for obj in self.iter_objects(prefix):
+            yield obj['Size']
+
     @abstractmethod
     def list_objects_with_dirs(self, prefix: str, delimiter: str = '/') -> Dict[str, Any]:
         """
@@ -122,6 +210,26 @@ class StorageBackend(ABC):
         """
         raise NotImplementedError("Write operations are optional for log-server backends")
 
+    def delete_many(self, paths: List[str]) -> Dict[str, List[str]]:
+        """
+        複数ファイルを一括削除する（オプショナル）
+
+        デフォルト実装はdeleteを逐次呼び出す（バックエンドで最適化可能）。
+
+        Args:
+            paths: ファイルパスリスト
+
+        Returns:
+            Dict: {'deleted': [成功したパス], 'failed': [失敗したパス]}
+        """
+        result = {'deleted': [], 'failed': []}
+        for path in paths:
+            if self.delete(path):
+                result['deleted'].append(path)
+            else:
+                result['failed'].append(path)
+        return result
+
     # --- オプショナルメソッド（Optional Operations） ---
 
     def generate_presigned_url(self, path: str, expires_in: int = 3600) -> Optional[str]:
@@ -4,16 +4,35 @@
 """
 
 import logging
+import mmap
+import os
+import stat as stat_module
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional, Generator, Dict, Any
+from typing import List, Optional, Generator, Dict, Any, Iterator, Union
 from datetime import datetime
 
 from ..registry import BackendRegistry
+from ..cache import TTLCache
 from ..config import LocalConfig
 from .base import StorageBackend
 
 logger = logging.getLogger(__name__)
 
+# load_mappedでこのサイズ以上のファイルはmmapで参照する（全体コピーを避ける）
+MMAP_THRESHOLD = 1024 * 1024  # 1MB
+
+# statキャッシュの最大エントリ数（超過時は最も長く参照されていないものから破棄）
+STAT_CACHE_MAX_ENTRIES = 10000
+
+# statキャッシュ未格納を表す番兵（Noneは「存在しない」のキャッシュ値として使用するため）
+_STAT_MISSING = object()
+
+# delete_manyでスレッドプールを使用する件数の閾値と最大スレッド数
+DELETE_PARALLEL_THRESHOLD = 64
+DELETE_MAX_WORKERS = 8
+
 
 @BackendRegistry.register("local")
 class LocalStorageBackend(StorageBackend):
@@ -31,12 +50,43 @@ class LocalStorageBackend(StorageBackend):
 
         self.base_path = Path(config.base_path)
         self.base_path.mkdir(parents=True, exist_ok=True)
+
+        # フルパス -> stat結果 or None のTTLキャッシュ
+        # Noneは「存在しない」ことを表すネガティブキャッシュ
+        self._stat_cache = TTLCache(config.stat_cache_ttl, STAT_CACHE_MAX_ENTRIES)
         logger.info(f"LocalStorageBackend initialized: path={self.base_path}")
 
     def _get_full_path(self, path: str) -> Path:
         """相対パスをフルパスに変換"""
         return self.base_path / path
 
+    def _cached_stat(self, full_path: Union[Path, str]) -> Optional[os.stat_result]:
+        """
+        TTL付きキャッシュ経由でstatを取得
+
+        同一リクエスト内や短時間の連続リクエストで同じファイルの
+        exists/get_metadataが繰り返される際のstatシステムコールを削減する。
+
+        Returns:
+            Optional[os.stat_result]: stat結果、存在しない場合はNone
+        """
+        key = str(full_path)
+        cached = self._stat_cache.get(key, _STAT_MISSING)
+        if cached is not _STAT_MISSING:
+            return cached
+
+        try:
+            result = os.stat(key)
+        except (FileNotFoundError, NotADirectoryError):
+            result = None
+
+        self._stat_cache.put(key, result)
+        return result
+
+    def _invalidate_stat(self, full_path: Path):
+        """statキャッシュから指定パスのエントリを削除"""
+        self._stat_cache.pop(str(full_path))
+
     def load(self, path: str) -> Optional[bytes]:
         try:
             full_path = self._get_full_path(path)
@@ -49,6 +99,33 @@ class LocalStorageBackend(StorageBackend):
             logger.error(f"Local load failed: {path} - {e}")
             return None
 
+    @contextmanager
+    def load_mapped(self, path: str) -> Iterator[Optional[Union[bytes, memoryview]]]:
+        # MMAP_THRESHOLD以上のファイルは読み取り専用mmapのビューを渡し、ブロック終了時に解放する
+        try:
+            f = open(self._get_full_path(path), 'rb')
+        except FileNotFoundError:
+            logger.debug(f"Local file not found: {path}")
+            yield None
+            return
+        except Exception as e:
+            logger.error(f"Local load failed: {path} - {e}")
+            yield None
+            return
+
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            if size < MMAP_THRESHOLD:
+                yield f.read()
+                return
+            with mmap.mmap(f.fileno(), length=0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    yield view
+                finally:
+                    # ビューが残っているとmmapを閉じられないため先に解放する
+                    view.release()
+
     def load_stream(self, path: str, chunk_size: int = 65536) -> Generator[bytes, None, None]:
         try:
             full_path = self._get_full_path(path)
@@ -62,27 +139,74 @@ class LocalStorageBackend(StorageBackend):
             logger.error(f"Local stream load failed: {path} - {e}")
             return
 
-    def list_objects(self, prefix: str) -> List[Dict[str, Any]]:
-        all_objects = []
-        base_dir = self._get_full_path(prefix)
+    def load_stream_into(self, path: str, buffer: bytearray) -> Generator[memoryview, None, None]:
+        try:
+            full_path = self._get_full_path(path)
+            view = memoryview(buffer)
+            with open(full_path, 'rb', buffering=0) as f:
+                while True:
+                    n = f.readinto(view)
+                    if not n:
+                        break
+                    yield view[:n]
+        except Exception as e:
+            logger.error(f"Local stream load failed: {path} - {e}")
+            return
 
-        if not base_dir.exists():
-            return []
+    def load_range(self, path: str, start: int, length: int) -> Optional[bytes]:
+        try:
+            with open(self._get_full_path(path), 'rb') as f:
+                f.seek(start)
+                return f.read(length)
+        except FileNotFoundError:
+            logger.debug(f"Local file not found: {path}")
+            return None
+        except Exception as e:
+            logger.error(f"Local range load failed: {path} - {e}")
+            return None
 
+    @staticmethod
+    def _iter_files(base_dir: str) -> Generator[os.DirEntry, None, None]:
+        """scandirでディレクトリ配下のファイルを再帰的に列挙"""
+        stack = [base_dir]
+        while stack:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file():
+                        yield entry
+
+    def iter_objects(self, prefix: str) -> Generator[Dict[str, Any], None, None]:
         try:
-            for file_path in base_dir.rglob('*'):
-                if file_path.is_file():
-                    relative_path = str(file_path.relative_to(self.base_path))
-                    stat = file_path.stat()
-                    all_objects.append({
-                        'Key': relative_path,
-                        'Size': stat.st_size,
-                        'LastModified': datetime.fromtimestamp(stat.st_mtime)
-                    })
+            for entry in self._iter_files(str(self._get_full_path(prefix))):
+                stat = self._cached_stat(entry.path)
+                if stat is None:
+                    continue
+                yield {
+                    'Key': str(Path(entry.path).relative_to(self.base_path)),
+                    'Size': stat.st_size,
+                    'LastModified': datetime.fromtimestamp(stat.st_mtime)
+                }
+        except (FileNotFoundError, NotADirectoryError):
+            return
         except Exception as e:
             logger.error(f"Local list_objects failed: {prefix} - {e}")
+            return
 
-        return all_objects
+    def list_objects(self, prefix: str) -> List[Dict[str, Any]]:
+        return list(self.iter_objects(prefix))
+
+    def iter_sizes(self, prefix: str) -> Generator[int, None, None]:
+        # Pathオブジェクトやdictを生成せず、scandirで直接サイズを取得
+        try:
+            for entry in self._iter_files(str(self._get_full_path(prefix))):
+                yield entry.stat().st_size
+        except (FileNotFoundError, NotADirectoryError):
+            return
+        except Exception as e:
+            logger.error(f"Local iter_sizes failed: {prefix} - {e}")
+            return
 
     def list_objects_with_dirs(self, prefix: str, delimiter: str = '/') -> Dict[str, Any]:
         base_dir = self._get_full_path(prefix)
@@ -112,15 +236,14 @@ class LocalStorageBackend(StorageBackend):
         return {'contents': contents, 'common_prefixes': common_prefixes}
 
     def exists(self, path: str) -> bool:
-        full_path = self._get_full_path(path)
-        return full_path.exists() and full_path.is_file()
+        stat = self._cached_stat(self._get_full_path(path))
+        return stat is not None and stat_module.S_ISREG(stat.st_mode)
 
     def get_metadata(self, path: str) -> Optional[Dict[str, Any]]:
         try:
-            full_path = self._get_full_path(path)
-            if not full_path.exists():
+            stat = self._cached_stat(self._get_full_path(path))
+            if stat is None:
                 return None
-            stat = full_path.stat()
             return {
                 'content_length': stat.st_size,
                 'last_modified': datetime.fromtimestamp(stat.st_mtime),
@@ -135,6 +258,7 @@ class LocalStorageBackend(StorageBackend):
             full_path.parent.mkdir(parents=True, exist_ok=True)
             with open(full_path, 'wb') as f:
                 f.write(content)
+            self._invalidate_stat(full_path)
             logger.debug(f"Local save success: {path}")
             return True
         except Exception as e:
@@ -146,11 +270,25 @@ class LocalStorageBackend(StorageBackend):
             full_path = self._get_full_path(path)
             if full_path.exists():
                 full_path.unlink()
+            self._invalidate_stat(full_path)
             return True
         except Exception as e:
             logger.error(f"Local delete failed: {path} - {e}")
             return False
 
+    def delete_many(self, paths: List[str]) -> Dict[str, List[str]]:
+        # 件数が多い場合はunlinkをスレッドプールで並列実行（I/O中はGILを解放）
+        if len(paths) < DELETE_PARALLEL_THRESHOLD:
+            outcomes = [self.delete(path) for path in paths]
+        else:
+            with ThreadPoolExecutor(max_workers=DELETE_MAX_WORKERS) as executor:
+                outcomes = list(executor.map(self.delete, paths))
+
+        result = {'deleted': [], 'failed': []}
+        for path, ok in zip(paths, outcomes):
+            result['deleted' if ok else 'failed'].append(path)
+        return result
+
     def generate_presigned_url(self, path: str, expires_in: int = 3600) -> Optional[str]:
         # ローカルモードでは事前署名URLをサポートしない
         logger.warning(f"Presigned URL not supported in local mode: {path}")
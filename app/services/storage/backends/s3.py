@@ -3,18 +3,100 @@
 AWS S3およびS3互換ストレージ（MinIO等）に対応。
 """
 
+import base64
+import io
 import logging
-from typing import List, Optional, Generator, Dict, Any
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Generator, Dict, Any, Iterable, Tuple
 
 import boto3
+from boto3.exceptions import S3UploadFailedError
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
+from ..cache import TTLCache
 from ..registry import BackendRegistry
 from ..config import S3Config
 from .base import StorageBackend
 
 logger = logging.getLogger(__name__)
 
+# list_objects_v2 1ページあたりの最大キー数（S3 APIの上限）
+LIST_PAGE_SIZE = 1000
+
+# list_objectsでサブプレフィックスを並列列挙する際の最大スレッド数
+LIST_MAX_WORKERS = 8
+
+# このサイズ以上のsaveはマルチパートで並列アップロードする
+MULTIPART_THRESHOLD = 8 * 1024 * 1024  # 8MB
+MULTIPART_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=MULTIPART_THRESHOLD,
+    multipart_chunksize=MULTIPART_THRESHOLD,
+    max_concurrency=10
+)
+
+# delete_objects 1回あたりの最大キー数（S3 APIの上限）
+DELETE_BATCH_SIZE = 1000
+
+# 接続設定ごとに共有するS3クライアント（boto3クライアントはスレッドセーフ）
+_client_cache: Dict[tuple, Any] = {}
+_client_cache_lock = threading.Lock()
+
+
+def _get_shared_client(config: S3Config):
+    """
+    同一接続設定のS3クライアントを共有して取得
+
+    リクエストごとにクライアントを生成するとTLSハンドシェイクや
+    エンドポイント解決が毎回発生するため、プロセス内で再利用する。
+    """
+    key = (
+        config.endpoint_url,
+        config.region,
+        config.access_key_id,
+        config.secret_access_key,
+        config.max_pool_connections
+    )
+    with _client_cache_lock:
+        client = _client_cache.get(key)
+        if client is None:
+            client_kwargs = {
+                'aws_access_key_id': config.access_key_id,
+                'aws_secret_access_key': config.secret_access_key,
+                'region_name': config.region,
+                'config': Config(
+                    max_pool_connections=config.max_pool_connections,
+                    retries={'mode': 'standard'},
+                    tcp_keepalive=True
+                )
+            }
+            if config.endpoint_url:
+                client_kwargs['endpoint_url'] = config.endpoint_url
+
+            client = boto3.client('s3', **client_kwargs)
+            _client_cache[key] = client
+        return client
+
+
+# list_objectsのサブプレフィックス列挙で共有するスレッドプール（呼び出しごとに生成しない）
+_list_executor: Optional[ThreadPoolExecutor] = None
+_list_executor_lock = threading.Lock()
+
+
+def _get_list_executor() -> ThreadPoolExecutor:
+    """サブプレフィックス列挙用の共有スレッドプールを取得（初回呼び出し時に生成）"""
+    global _list_executor
+    with _list_executor_lock:
+        if _list_executor is None:
+            _list_executor = ThreadPoolExecutor(
+                max_workers=LIST_MAX_WORKERS,
+                thread_name_prefix='s3-list'
+            )
+        return _list_executor
+
 
 @BackendRegistry.register("s3")
 class S3StorageBackend(StorageBackend):
@@ -30,25 +112,90 @@ class S3StorageBackend(StorageBackend):
         if config is None:
             config = S3Config.from_env()
 
-        client_kwargs = {
-            'aws_access_key_id': config.access_key_id,
-            'aws_secret_access_key': config.secret_access_key,
-            'region_name': config.region
-        }
+        self.client = _get_shared_client(config)
+        self.bucket_name = config.bucket_name
+        self.upload_checksum = config.upload_checksum
 
-        if config.endpoint_url:
-            client_kwargs['endpoint_url'] = config.endpoint_url
+        # 小さいオブジェクトのLRUキャッシュ: Key -> (ETag, 本文, メタデータ)
+        # protocol.yaml等の同一オブジェクトへの繰り返しアクセスでHTTP往復を省く
+        self._object_cache_max_object_size = config.object_cache_max_object_size
+        self._object_cache = TTLCache(config.object_cache_ttl, config.object_cache_max_entries)
 
-        self.client = boto3.client('s3', **client_kwargs)
-        self.bucket_name = config.bucket_name
+        # ディレクトリ一覧のTTL付きLRUキャッシュ: (Prefix, Delimiter) -> 一覧
+        # UIは階層移動のたびに同じプレフィックスを再取得するため、短時間はメモリから返す
+        self._listing_cache = TTLCache(config.listing_cache_ttl, config.listing_cache_max_entries)
         logger.info(f"S3StorageBackend initialized: bucket={self.bucket_name}")
 
+    # --- オブジェクトキャッシュ ---
+
+    def _cache_get(self, path: str) -> Optional[Tuple[Optional[str], bytes, Dict[str, Any]]]:
+        """キャッシュエントリ (ETag, 本文, メタデータ) を取得（期限切れでも返す）"""
+        return self._object_cache.get_stale(path)
+
+    def _cache_get_fresh(self, path: str) -> Optional[Tuple[Optional[str], bytes, Dict[str, Any]]]:
+        """有効期限内のキャッシュエントリのみを取得"""
+        return self._object_cache.get(path)
+
+    def _cache_put(self, path: str, etag: Optional[str], body: bytes, metadata: Dict[str, Any]):
+        """オブジェクトをキャッシュに格納（サイズ上限以上は格納しない）"""
+        if len(body) >= self._object_cache_max_object_size:
+            return
+        self._object_cache.put(path, (etag, body, metadata))
+
+    def _cache_invalidate(self, path: str):
+        """キャッシュから指定キーを削除"""
+        self._object_cache.pop(path)
+
+    # --- ディレクトリ一覧キャッシュ ---
+
+    def _listing_cache_get(self, key: Tuple[str, str]) -> Optional[Dict[str, Any]]:
+        """有効期限内のディレクトリ一覧を取得（呼び出し側で変更しないこと）"""
+        return self._listing_cache.get(key)
+
+    def _listing_cache_put(self, key: Tuple[str, str], listing: Dict[str, Any]):
+        """ディレクトリ一覧をキャッシュに格納"""
+        self._listing_cache.put(key, listing)
+
+    def _listing_cache_invalidate(self, paths: List[str]):
+        """指定キーを含みうるプレフィックスの一覧をキャッシュから削除"""
+        self._listing_cache.discard_where(
+            lambda key: any(path.startswith(key[0]) for path in paths)
+        )
+
+    @staticmethod
+    def _to_metadata(response: Dict[str, Any]) -> Dict[str, Any]:
+        """GetObject/HeadObjectレスポンスからメタデータを抽出"""
+        return {
+            'content_length': response['ContentLength'],
+            'last_modified': response['LastModified'],
+            'content_type': response.get('ContentType', 'application/octet-stream')
+        }
+
+    # --- 読み取り系メソッド ---
+
     def load(self, path: str) -> Optional[bytes]:
+        fresh = self._cache_get_fresh(path)
+        if fresh is not None:
+            return fresh[1]
+
+        entry = self._cache_get(path)
+        params = {'Bucket': self.bucket_name, 'Key': path}
+        if entry is not None and entry[0]:
+            # 期限切れ: ETagで条件付きGETし、未変更なら本文を再利用する
+            params['IfNoneMatch'] = entry[0]
+
         try:
-            response = self.client.get_object(Bucket=self.bucket_name, Key=path)
-            return response['Body'].read()
+            response = self.client.get_object(**params)
+            body = response['Body'].read()
+            self._cache_put(path, response.get('ETag'), body, self._to_metadata(response))
+            return body
         except ClientError as e:
             error_code = e.response.get('Error', {}).get('Code', '')
+            if entry is not None and error_code in ('304', 'NotModified'):
+                etag, body, metadata = entry
+                self._cache_put(path, etag, body, metadata)
+                return body
+            self._cache_invalidate(path)
             if error_code == 'NoSuchKey':
                 logger.debug(f"S3 object not found: {path}")
             else:
@@ -68,56 +215,148 @@ class S3StorageBackend(StorageBackend):
             logger.error(f"S3 stream load failed: {path} - {e}")
             return
 
+    def load_stream_into(self, path: str, buffer: bytearray) -> Generator[memoryview, None, None]:
+        try:
+            response = self.client.get_object(Bucket=self.bucket_name, Key=path)
+            body = response['Body']
+            view = memoryview(buffer)
+            while True:
+                n = body.readinto(view)
+                if not n:
+                    break
+                yield view[:n]
+        except ClientError as e:
+            logger.error(f"S3 stream load failed: {path} - {e}")
+            return
+
+    def load_range(self, path: str, start: int, length: int) -> Optional[bytes]:
+        entry = self._cache_get_fresh(path)
+        if entry is not None:
+            return entry[1][start:start + length]
+        if length <= 0:
+            return b''
+
+        try:
+            response = self.client.get_object(
+                Bucket=self.bucket_name,
+                Key=path,
+                Range=f"bytes={start}-{start + length - 1}"
+            )
+            return response['Body'].read()
+        except ClientError as e:
+            error_code = e.response.get('Error', {}).get('Code', '')
+            if error_code == 'InvalidRange':
+                # 空オブジェクト、または開始位置がオブジェクト末尾以降
+                return b''
+            if error_code == 'NoSuchKey':
+                logger.debug(f"S3 object not found: {path}")
+            else:
+                logger.error(f"S3 range load failed: {path} - {e}")
+            return None
+
+    def _paginate(self, prefix: str, delimiter: Optional[str] = None) -> Iterable[Dict[str, Any]]:
+        """list_objects_v2のページを順に取得するイテレータ"""
+        params = {
+            'Bucket': self.bucket_name,
+            'Prefix': prefix,
+            'PaginationConfig': {'PageSize': LIST_PAGE_SIZE}
+        }
+        if delimiter:
+            params['Delimiter'] = delimiter
+        paginator = self.client.get_paginator('list_objects_v2')
+        return paginator.paginate(**params)
+
+    @staticmethod
+    def _extract_objects(page: Dict[str, Any], prefix: str) -> List[Dict[str, Any]]:
+        """ページからファイルオブジェクト情報を抽出（フォルダ自体は除外）"""
+        return [
+            {
+                'Key': obj['Key'],
+                'Size': obj['Size'],
+                'LastModified': obj['LastModified']
+            }
+            for obj in page.get('Contents', [])
+            if obj['Key'] != prefix and not obj['Key'].endswith('/')
+        ]
+
+    def _list_all(self, prefix: str) -> List[Dict[str, Any]]:
+        """プレフィックス配下の全オブジェクトを逐次ページングで取得"""
+        all_objects = []
+        for page in self._paginate(prefix):
+            all_objects.extend(self._extract_objects(page, prefix))
+        return all_objects
+
     def list_objects(self, prefix: str) -> List[Dict[str, Any]]:
+        # 直下のみDelimiter付きで取得し、サブプレフィックスは並列に列挙する
+        # （ページングは逐次RTTに律速されるため、プレフィックス単位で分散）
         all_objects = []
-        continuation_token = None
+        sub_prefixes = []
 
-        while True:
-            params = {
-                'Bucket': self.bucket_name,
-                'Prefix': prefix,
-            }
-            if continuation_token:
-                params['ContinuationToken'] = continuation_token
+        try:
+            for page in self._paginate(prefix, delimiter='/'):
+                all_objects.extend(self._extract_objects(page, prefix))
+                sub_prefixes.extend(p['Prefix'] for p in page.get('CommonPrefixes', []))
 
-            try:
-                response = self.client.list_objects_v2(**params)
-            except ClientError as e:
-                logger.error(f"S3 list_objects failed: {prefix} - {e}")
-                return []
-
-            contents = response.get('Contents', [])
-            for obj in contents:
-                if obj['Key'] != prefix and not obj['Key'].endswith('/'):
-                    all_objects.append({
-                        'Key': obj['Key'],
-                        'Size': obj['Size'],
-                        'LastModified': obj['LastModified']
-                    })
-
-            if response.get('IsTruncated'):
-                continuation_token = response.get('NextContinuationToken')
-            else:
-                break
+            if sub_prefixes:
+                for objects in _get_list_executor().map(self._list_all, sub_prefixes):
+                    all_objects.extend(objects)
+        except ClientError as e:
+            logger.error(f"S3 list_objects failed: {prefix} - {e}")
+            return []
 
+        # 直下のオブジェクトとサブプレフィックス配下を連結した順序になるため、
+        # 一括列挙と同じキーの辞書順に揃える
+        all_objects.sort(key=lambda obj: obj['Key'])
         return all_objects
 
+    def iter_objects(self, prefix: str) -> Generator[Dict[str, Any], None, None]:
+        # ページ単位で逐次yield（全件をリストに保持しない）
+        try:
+            for page in self._paginate(prefix):
+                yield from self._extract_objects(page, prefix)
+        except ClientError as e:
+            logger.error(f"S3 iter_objects failed: {prefix} - {e}")
+            return
+
+    def iter_sizes(self, prefix: str) -> Generator[int, None, None]:
+        # オブジェクト情報のdictを組み立てず、Sizeのみを取り出す
+        try:
+            for page in self._paginate(prefix):
+                for obj in page.get('Contents', []):
+                    key = obj['Key']
+                    if key != prefix and not key.endswith('/'):
+                        yield obj['Size']
+        except ClientError as e:
+            logger.error(f"S3 iter_sizes failed: {prefix} - {e}")
+            return
+
     def list_objects_with_dirs(self, prefix: str, delimiter: str = '/') -> Dict[str, Any]:
+        cache_key = (prefix, delimiter)
+        listing = self._listing_cache_get(cache_key)
+        if listing is not None:
+            return listing
+
+        # 1回のlist_objects_v2は最大1000件のため、全ページを取得する
+        # （呼び出し側で全件をソート・件数集計するため途中で打ち切らない）
+        contents = []
+        common_prefixes = []
         try:
-            response = self.client.list_objects_v2(
-                Bucket=self.bucket_name,
-                Prefix=prefix,
-                Delimiter=delimiter
-            )
-            return {
-                'contents': response.get('Contents', []),
-                'common_prefixes': response.get('CommonPrefixes', [])
+            for page in self._paginate(prefix, delimiter=delimiter):
+                contents.extend(page.get('Contents', []))
+                common_prefixes.extend(page.get('CommonPrefixes', []))
+            listing = {
+                'contents': contents,
+                'common_prefixes': common_prefixes
             }
+            self._listing_cache_put(cache_key, listing)
+            return listing
         except ClientError as e:
             logger.error(f"S3 list_objects_with_dirs failed: {prefix} - {e}")
             return {'contents': [], 'common_prefixes': []}
 
     def exists(self, path: str) -> bool:
+        if self._cache_get_fresh(path) is not None:
+            return True
         try:
             self.client.head_object(Bucket=self.bucket_name, Key=path)
             return True
@@ -125,38 +364,95 @@ class S3StorageBackend(StorageBackend):
             return False
 
     def get_metadata(self, path: str) -> Optional[Dict[str, Any]]:
+        entry = self._cache_get_fresh(path)
+        if entry is not None:
+            return dict(entry[2])
         try:
             response = self.client.head_object(Bucket=self.bucket_name, Key=path)
-            return {
-                'content_length': response['ContentLength'],
-                'last_modified': response['LastModified'],
-                'content_type': response.get('ContentType', 'application/octet-stream')
-            }
+            return self._to_metadata(response)
         except ClientError:
             return None
 
     def save(self, path: str, content: bytes, content_type: str = 'application/octet-stream') -> bool:
         try:
-            self.client.put_object(
-                Bucket=self.bucket_name,
-                Key=path,
-                Body=content,
-                ContentType=content_type
-            )
+            if len(content) >= MULTIPART_THRESHOLD:
+                self._save_multipart(path, content, content_type)
+            else:
+                params = {
+                    'Bucket': self.bucket_name,
+                    'Key': path,
+                    'Body': content,
+                    'ContentType': content_type
+                }
+                if self.upload_checksum:
+                    # CRC32を事前計算して付与し、S3側で転送中の破損を検出させる
+                    # （zlib.crc32はC実装のため計算コストはほぼ無視できる）
+                    crc = zlib.crc32(content).to_bytes(4, 'big')
+                    params['ChecksumCRC32'] = base64.b64encode(crc).decode('ascii')
+                self.client.put_object(**params)
+            self._cache_invalidate(path)
+            self._listing_cache_invalidate([path])
             logger.debug(f"S3 upload success: {path}")
             return True
-        except ClientError as e:
+        except (ClientError, S3UploadFailedError) as e:
             logger.error(f"S3 upload failed: {path} - {e}")
             return False
 
+    def _save_multipart(self, path: str, content: bytes, content_type: str):
+        """大きなペイロードをマルチパート（パート単位で並列）でアップロード"""
+        extra_args = {'ContentType': content_type}
+        if self.upload_checksum:
+            # マルチパートではパートごとのチェックサムをs3transferが計算する
+            extra_args['ChecksumAlgorithm'] = 'CRC32'
+        self.client.upload_fileobj(
+            io.BytesIO(content),
+            self.bucket_name,
+            path,
+            ExtraArgs=extra_args,
+            Config=MULTIPART_TRANSFER_CONFIG
+        )
+
     def delete(self, path: str) -> bool:
         try:
             self.client.delete_object(Bucket=self.bucket_name, Key=path)
+            self._cache_invalidate(path)
+            self._listing_cache_invalidate([path])
             return True
         except ClientError as e:
             logger.error(f"S3 delete failed: {path} - {e}")
             return False
 
+    def delete_many(self, paths: List[str]) -> Dict[str, List[str]]:
+        # DeleteObjectsで最大1000件ずつまとめて削除（N回 → ceil(N/1000)回のリクエスト）
+        result = {'deleted': [], 'failed': []}
+        for i in range(0, len(paths), DELETE_BATCH_SIZE):
+            chunk = paths[i:i + DELETE_BATCH_SIZE]
+            try:
+                response = self.client.delete_objects(
+                    Bucket=self.bucket_name,
+                    Delete={
+                        'Objects': [{'Key': path} for path in chunk],
+                        'Quiet': True
+                    }
+                )
+            except ClientError as e:
+                logger.error(f"S3 delete_objects failed: {len(chunk)} keys - {e}")
+                result['failed'].extend(chunk)
+                continue
+
+            # Quietモードではエラーになったキーのみ返される
+            failed = {err['Key'] for err in response.get('Errors', [])}
+            for err in response.get('Errors', []):
+                logger.error(f"S3 delete failed: {err['Key']} - {err.get('Code')}: {err.get('Message')}")
+            self._listing_cache_invalidate(chunk)
+            for path in chunk:
+                self._cache_invalidate(path)
+                if path in failed:
+                    result['failed'].append(path)
+                else:
+                    result['deleted'].append(path)
+        return result
+
     def generate_presigned_url(self, path: str, expires_in: int = 3600) -> Optional[str]:
         try:
             url = self.client.generate_presigned_url(
@@ -0,0 +1,114 @@
+"""TTL付きLRUキャッシュ
+
+ストレージ関連のインメモリキャッシュ（オブジェクト本文・一覧・stat・事前署名URL）で共通に使用する。
+生成したキャッシュはすべて登録され、StorageService.reset_instance() から
+clear_all_caches() でまとめて破棄される。
+"""
+
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+# 生存中のキャッシュ（接続先の切り替え時にまとめて破棄するため）
+_caches: 'weakref.WeakSet[TTLCache]' = weakref.WeakSet()
+_caches_lock = threading.Lock()
+
+
+class TTLCache:
+    """
+    スレッドセーフなTTL付きLRUキャッシュ
+
+    上限件数を超えると最も長く参照されていないエントリから破棄する。
+    期限切れのエントリはgetでは返さないが、get_staleでは返す
+    （ETagによる条件付き取得など、期限切れの値を再検証に使う場合）。
+    格納した値は呼び出し側で変更しないこと。
+    """
+
+    def __init__(self, ttl: Optional[float], max_entries: int):
+        """
+        Args:
+            ttl: 有効期間（秒）。Noneは無期限、0以下はキャッシュ無効
+            max_entries: 最大エントリ数
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # キー -> (格納時刻, 値)
+        self._entries: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        with _caches_lock:
+            _caches.add(self)
+
+    @property
+    def enabled(self) -> bool:
+        """キャッシュが有効かどうか"""
+        return self.ttl is None or self.ttl > 0
+
+    def _is_fresh(self, stored_at: float) -> bool:
+        return self.ttl is None or time.monotonic() - stored_at < self.ttl
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        有効期限内の値を取得する
+
+        Args:
+            key: キー
+            default: 未格納・期限切れの場合に返す値
+
+        Returns:
+            格納された値、またはdefault
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not self._is_fresh(entry[0]):
+                return default
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def get_stale(self, key: Hashable, default: Any = None) -> Any:
+        """期限切れかどうかに関わらず格納された値を取得する"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """値を格納する（キャッシュ無効時は何もしない）"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        """指定キーのエントリを削除する"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def discard_where(self, predicate: Callable[[Hashable], bool]) -> None:
+        """条件に一致するキーのエントリをまとめて削除する"""
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        """全エントリを削除する"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+def clear_all_caches() -> None:
+    """生存中のすべてのTTLCacheを破棄する（StorageService.reset_instance() から呼び出される）"""
+    with _caches_lock:
+        caches = list(_caches)
+    for cache in caches:
+        cache.clear()
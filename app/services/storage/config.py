@@ -16,6 +16,13 @@ class S3Config:
     region: str = "ap-northeast-1"
     access_key_id: Optional[str] = None
     secret_access_key: Optional[str] = None
+    max_pool_connections: int = 50
+    object_cache_ttl: float = 60.0  # 小さいオブジェクトのキャッシュ有効期間（秒）、0で無効
+    object_cache_max_entries: int = 256
+    object_cache_max_object_size: int = 1024 * 1024  # これ未満のオブジェクトのみキャッシュ
+    listing_cache_ttl: float = 30.0  # ディレクトリ一覧のキャッシュ有効期間（秒）、0で無効
+    listing_cache_max_entries: int = 1024
+    upload_checksum: bool = True  # アップロード時にCRC32チェックサムを付与（非対応のS3互換ストレージではFalse）
 
     @classmethod
     def from_env(cls) -> 'S3Config':
@@ -25,7 +32,14 @@ class S3Config:
             endpoint_url=os.getenv('S3_ENDPOINT_URL'),
             region=os.getenv('AWS_DEFAULT_REGION', 'ap-northeast-1'),
             access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-            secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
+            secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+            max_pool_connections=int(os.getenv('S3_MAX_POOL_CONNECTIONS', '50')),
+            object_cache_ttl=float(os.getenv('S3_OBJECT_CACHE_TTL', '60')),
+            object_cache_max_entries=int(os.getenv('S3_OBJECT_CACHE_MAX_ENTRIES', '256')),
+            object_cache_max_object_size=int(os.getenv('S3_OBJECT_CACHE_MAX_OBJECT_SIZE', str(1024 * 1024))),
+            listing_cache_ttl=float(os.getenv('S3_LISTING_CACHE_TTL', '30')),
+            listing_cache_max_entries=int(os.getenv('S3_LISTING_CACHE_MAX_ENTRIES', '1024')),
+            upload_checksum=os.getenv('S3_UPLOAD_CHECKSUM', 'true').lower() == 'true'
         )
 
 
@@ -33,12 +47,14 @@ class S3Config:
 class LocalConfig:
     """ローカルストレージ固有設定"""
     base_path: str = "/data/storage"
+    stat_cache_ttl: float = 1.0  # stat結果のキャッシュ有効期間（秒）、0で無効
 
     @classmethod
     def from_env(cls) -> 'LocalConfig':
         """環境変数から設定を読み込み"""
         return cls(
-            base_path=os.getenv('LOCAL_STORAGE_PATH', '/data/storage')
+            base_path=os.getenv('LOCAL_STORAGE_PATH', '/data/storage'),
+            stat_cache_ttl=float(os.getenv('LOCAL_STAT_CACHE_TTL', '1.0'))
         )
 
 
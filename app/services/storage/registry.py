@@ -3,7 +3,7 @@
 ストレージバックエンドの動的登録・取得を管理。
 """
 
-from typing import Dict, Type, TYPE_CHECKING
+from typing import Dict, Optional, Type, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from .backends.base import StorageBackend
@@ -13,6 +13,8 @@ class BackendRegistry:
     """ストレージバックエンドのレジストリ"""
 
     _backends: Dict[str, Type['StorageBackend']] = {}
+    # 指定されたモード文字列そのまま -> バックエンドクラスの解決済みキャッシュ
+    _resolved: Dict[str, Type['StorageBackend']] = {}
 
     @classmethod
     def register(cls, mode: str):
@@ -26,9 +28,20 @@ class BackendRegistry:
         """
         def decorator(backend_class: Type['StorageBackend']):
             cls._backends[mode.lower()] = backend_class
+            cls._resolved.clear()
             return backend_class
         return decorator
 
+    @classmethod
+    def _resolve(cls, mode: str) -> Optional[Type['StorageBackend']]:
+        """モード名からバックエンドクラスを解決（lower()は初回のみ）"""
+        backend_class = cls._resolved.get(mode)
+        if backend_class is None:
+            backend_class = cls._backends.get(mode.lower())
+            if backend_class is not None:
+                cls._resolved[mode] = backend_class
+        return backend_class
+
     @classmethod
     def get(cls, mode: str) -> Type['StorageBackend']:
         """
@@ -43,11 +56,11 @@ class BackendRegistry:
         Raises:
             ValueError: 未登録のモードが指定された場合
         """
-        mode_lower = mode.lower()
-        if mode_lower not in cls._backends:
+        backend_class = cls._resolve(mode)
+        if backend_class is None:
             available = ", ".join(cls._backends.keys())
             raise ValueError(f"Unknown storage mode: {mode}. Available: {available}")
-        return cls._backends[mode_lower]
+        return backend_class
 
     @classmethod
     def list_modes(cls) -> list:
@@ -57,9 +70,10 @@ class BackendRegistry:
     @classmethod
     def is_registered(cls, mode: str) -> bool:
         """モードが登録済みか確認"""
-        return mode.lower() in cls._backends
+        return cls._resolve(mode) is not None
 
     @classmethod
     def clear(cls):
         """テスト用: レジストリをクリア"""
         cls._backends.clear()
+        cls._resolved.clear()
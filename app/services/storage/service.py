@@ -4,9 +4,18 @@
 責任分離型設計: Read + 管理機能を提供（Write操作はオプショナル）
 """
 
+import json
 import logging
+import threading
 from typing import Optional, List, Dict, Any, Generator
 
+# orjsonが利用可能なら使用（bytesを直接パース/出力でき、標準jsonより高速）
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from .cache import clear_all_caches
 from .config import StorageConfig
 from .registry import BackendRegistry
 from .backends.base import StorageBackend
@@ -25,11 +34,17 @@ class StorageService:
 
     _instance: Optional['StorageService'] = None
     _config: Optional[StorageConfig] = None
+    # 初回生成の競合で_initializeが二重実行されないよう保護する
+    _lock = threading.Lock()
 
     def __new__(cls, config: Optional[StorageConfig] = None):
         if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            cls._instance._initialize(config)
+            with cls._lock:
+                if cls._instance is None:
+                    instance = super().__new__(cls)
+                    instance._initialize(config)
+                    # 初期化完了後に公開（他スレッドが未初期化インスタンスを見ないように）
+                    cls._instance = instance
         return cls._instance
 
     def _initialize(self, config: Optional[StorageConfig] = None):
@@ -64,6 +79,10 @@ class StorageService:
         """ファイルを読み込み"""
         return self._backend.load(path)
 
+    def load_mapped(self, path: str):
+        """ファイル内容をコピーせずに参照（withブロック内でのみ有効なコンテキストマネージャ）"""
+        return self._backend.load_mapped(path)
+
     def load_text(self, path: str, encoding: str = 'utf-8') -> Optional[str]:
         """テキストファイルを読み込み"""
         content = self.load(path)
@@ -73,20 +92,34 @@ class StorageService:
 
     def load_json(self, path: str) -> Optional[dict]:
         """JSONファイルを読み込み"""
-        import json
-        text = self.load_text(path)
-        if text is None:
-            return None
-        return json.loads(text)
+        # 大きなファイルはコピーせずに参照したまま解析する
+        with self.load_mapped(path) as content:
+            if content is None:
+                return None
+            if orjson is not None:
+                return orjson.loads(content)
+            return json.loads(str(content, 'utf-8'))
 
     def load_stream(self, path: str, chunk_size: int = 65536) -> Generator[bytes, None, None]:
         """ファイルをストリーミング読み込み"""
         return self._backend.load_stream(path, chunk_size)
 
+    def load_stream_into(self, path: str, buffer: bytearray) -> Generator[memoryview, None, None]:
+        """バッファを再利用してストリーミング読み込み（ビューは次チャンクで上書きされる）"""
+        return self._backend.load_stream_into(path, buffer)
+
+    def load_range(self, path: str, start: int, length: int) -> Optional[bytes]:
+        """ファイルの指定範囲のみを読み込み"""
+        return self._backend.load_range(path, start, length)
+
     def list_objects(self, prefix: str) -> List[Dict[str, Any]]:
         """オブジェクト一覧を取得"""
         return self._backend.list_objects(prefix)
 
+    def iter_objects(self, prefix: str) -> Generator[Dict[str, Any], None, None]:
+        """オブジェクトを逐次列挙（全件をリストに保持しない）"""
+        return self._backend.iter_objects(prefix)
+
     def list_objects_with_dirs(self, prefix: str, delimiter: str = '/') -> Dict[str, Any]:
         """ファイルとディレクトリの一覧を取得"""
         return self._backend.list_objects_with_dirs(prefix, delimiter)
@@ -101,8 +134,7 @@ class StorageService:
 
     def calculate_total_size(self, prefix: str) -> int:
         """指定プレフィックス配下の合計サイズを計算"""
-        objects = self.list_objects(prefix)
-        return sum(obj['Size'] for obj in objects)
+        return sum(self._backend.iter_sizes(prefix))
 
     # --- 書き込み系メソッド（オプショナル） ---
 
@@ -116,14 +148,20 @@ class StorageService:
 
     def save_json(self, path: str, data: dict) -> bool:
         """JSONファイルを保存（オプショナル）"""
-        import json
-        content = json.dumps(data, ensure_ascii=False, indent=2)
-        return self.save(path, content.encode('utf-8'), content_type='application/json')
+        if orjson is not None:
+            content = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        else:
+            content = json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+        return self.save(path, content, content_type='application/json')
 
     def delete(self, path: str) -> bool:
         """ファイル削除（オプショナル）"""
         return self._backend.delete(path)
 
+    def delete_many(self, paths: List[str]) -> Dict[str, List[str]]:
+        """複数ファイルを一括削除（オプショナル）"""
+        return self._backend.delete_many(paths)
+
     # --- S3固有メソッド ---
 
     def generate_presigned_url(self, path: str, expires_in: int = 3600) -> Optional[str]:
@@ -139,8 +177,12 @@ class StorageService:
 
         注意: 本番環境では使用しないこと
         """
-        cls._instance = None
-        cls._config = None
+        with cls._lock:
+            cls._instance = None
+            cls._config = None
+
+        # 一覧・事前署名URL等のキャッシュは旧インスタンスの接続先の内容のため破棄する
+        clear_all_caches()
 
 
 def get_storage(config: Optional[StorageConfig] = None) -> StorageService:
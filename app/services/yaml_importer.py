@@ -1,12 +1,20 @@
 """
 YAMLファイルからポート情報をDBにインポートするサービス
 """
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List
+from typing import BinaryIO, Dict, List, Optional, Set, Tuple
 import yaml
 from sqlalchemy.orm import Session
 from define_db.models import Process, Run, Port, PortConnection
 from define_db.database import SessionLocal
+from services.storage_service import get_storage
+
+# libyamlのC実装が利用可能なら使用（純Python実装より大幅に高速）
+try:
+    from yaml import CSafeLoader as _YAMLLoader, CSafeDumper as _YAMLDumper
+except ImportError:
+    from yaml import SafeLoader as _YAMLLoader, SafeDumper as _YAMLDumper
 
 
 class YAMLPortImporter:
@@ -15,6 +23,36 @@ class YAMLPortImporter:
     def __init__(self, session: Session):
         self.session = session
 
+    @staticmethod
+    def _read_local_text(path: Path) -> Optional[str]:
+        """ローカルファイルを読み込み（存在しない場合はNone）"""
+        try:
+            return path.read_text(encoding='utf-8')
+        except FileNotFoundError:
+            return None
+
+    def _load_yaml_texts(self, storage_address: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        protocol.yaml / manipulate.yaml の内容を取得
+
+        絶対パスは従来どおりローカルファイルとして読み込み、
+        それ以外（runs/1/ 等）はStorageService経由で2ファイルを並列取得する
+        （S3では2回分のHTTP往復が重なり、オブジェクトキャッシュも効く）。
+        """
+        if Path(storage_address).is_absolute():
+            base = Path(storage_address)
+            return (
+                self._read_local_text(base / "protocol.yaml"),
+                self._read_local_text(base / "manipulate.yaml")
+            )
+
+        storage = get_storage()
+        prefix = storage_address.rstrip('/')
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            protocol_future = executor.submit(storage.load_text, f"{prefix}/protocol.yaml")
+            manipulate_future = executor.submit(storage.load_text, f"{prefix}/manipulate.yaml")
+            return protocol_future.result(), manipulate_future.result()
+
     def import_from_run(self, run_id: int, storage_address: str, skip_existing: bool = True) -> Dict[str, int]:
         """
         Runのポート情報をYAMLから一括インポート（冪等性対応）
@@ -22,6 +60,7 @@ class YAMLPortImporter:
         Args:
             run_id: Run ID
             storage_address: YAMLファイルのあるディレクトリパス
+                （絶対パスはローカル、相対パスはストレージキーのプレフィックス）
             skip_existing: True=既存データはスキップ（デフォルト）、False=エラー
 
         Returns:
@@ -32,18 +71,53 @@ class YAMLPortImporter:
             yaml.YAMLError: YAML解析エラー
         """
         # YAMLファイル読み込み
-        protocol_path = Path(storage_address) / "protocol.yaml"
-        manipulate_path = Path(storage_address) / "manipulate.yaml"
+        protocol_text, manipulate_text = self._load_yaml_texts(storage_address)
 
-        if not protocol_path.exists() or not manipulate_path.exists():
+        if protocol_text is None or manipulate_text is None:
             raise FileNotFoundError(f"YAML files not found at {storage_address}")
 
-        with open(protocol_path, 'r', encoding='utf-8') as f:
-            protocol_data = yaml.safe_load(f)
+        protocol_data = yaml.load(protocol_text, Loader=_YAMLLoader)
+        manipulate_data = yaml.load(manipulate_text, Loader=_YAMLLoader)
+
+        return self._import_from_data(run_id, protocol_data, manipulate_data, skip_existing)
+
+    def import_from_streams(
+        self,
+        run_id: int,
+        protocol_fp: BinaryIO,
+        manipulate_fp: BinaryIO,
+        skip_existing: bool = True
+    ) -> Dict[str, int]:
+        """
+        オープン済みのファイルオブジェクトからRunのポート情報をインポート（冪等性対応）
+
+        ファイル内容を文字列として読み込まず、ストリームから直接YAMLを解析する。
 
-        with open(manipulate_path, 'r', encoding='utf-8') as f:
-            manipulate_data = yaml.safe_load(f)
+        Args:
+            run_id: Run ID
+            protocol_fp: protocol.yaml のファイルオブジェクト（バイナリモード）
+            manipulate_fp: manipulate.yaml のファイルオブジェクト（バイナリモード）
+            skip_existing: True=既存データはスキップ（デフォルト）、False=エラー
+
+        Returns:
+            {"ports_created": 10, "ports_skipped": 5, "connections_created": 5, "connections_skipped": 2}
+
+        Raises:
+            yaml.YAMLError: YAML解析エラー
+        """
+        protocol_data = yaml.load(protocol_fp, Loader=_YAMLLoader)
+        manipulate_data = yaml.load(manipulate_fp, Loader=_YAMLLoader)
 
+        return self._import_from_data(run_id, protocol_data, manipulate_data, skip_existing)
+
+    def _import_from_data(
+        self,
+        run_id: int,
+        protocol_data: Dict,
+        manipulate_data: List[Dict],
+        skip_existing: bool = True
+    ) -> Dict[str, int]:
+        """解析済みのYAMLデータからPorts/PortConnectionsを作成"""
         # このRunのすべてのProcessを取得
         processes = self.session.query(Process).filter(
             Process.run_id == run_id
@@ -54,21 +128,38 @@ class YAMLPortImporter:
         connections_created = 0
         connections_skipped = 0
 
-        # 各ProcessのPorts作成
+        # 検索用インデックスを事前構築（プロセスごとの線形探索を回避）
+        op_by_id = self._index_by(protocol_data.get('operations', []), 'id')
+        def_by_name = self._index_by(manipulate_data, 'name')
+
+        # 各ProcessのPorts作成（行データを収集し、まとめて一括INSERT）
+        # 既存ポートのキーを1クエリで取得し、キューに積んだ行のキーも追加していく
+        # （一括INSERT前のため、同一定義内の重複idもここで検出する）
+        port_keys = self._load_port_keys(processes)
+        port_rows: List[Dict] = []
         for process in processes:
             result = self._import_ports_for_process(
-                process, protocol_data, manipulate_data, skip_existing
+                process, op_by_id, def_by_name, port_keys, port_rows, skip_existing
             )
             ports_created += result['created']
             ports_skipped += result['skipped']
 
-        # Connections作成
+        if port_rows:
+            self.session.bulk_insert_mappings(Port, port_rows)
+
+        # Connections作成（作成したポートのIDを確定させてから一括取得）
+        self.session.flush()
+        port_index = self._build_port_index(processes)
+        connection_rows: List[Dict] = []
         result = self._import_connections(
-            run_id, processes, protocol_data, skip_existing
+            run_id, processes, protocol_data, port_index, connection_rows, skip_existing
         )
         connections_created += result['created']
         connections_skipped += result['skipped']
 
+        if connection_rows:
+            self.session.bulk_insert_mappings(PortConnection, connection_rows)
+
         self.session.commit()
 
         return {
@@ -78,20 +169,44 @@ class YAMLPortImporter:
             "connections_skipped": connections_skipped
         }
 
+    @staticmethod
+    def _index_by(items: List[Dict], key: str) -> Dict:
+        """リストを指定キーで辞書化（重複時は従来の線形探索と同じく先頭を優先）"""
+        index = {}
+        for item in items:
+            index.setdefault(item.get(key), item)
+        return index
+
+    def _load_port_keys(self, processes: List[Process]) -> Set[Tuple[int, str, str]]:
+        """
+        プロセス群の既存ポートのキーを1クエリで取得
+
+        Returns:
+            {(process_id, port_type, port_name)}
+        """
+        process_ids = [p.id for p in processes]
+        if not process_ids:
+            return set()
+
+        return set(
+            self.session.query(
+                Port.process_id, Port.port_type, Port.port_name
+            ).filter(Port.process_id.in_(process_ids)).all()
+        )
+
     def _import_ports_for_process(
         self,
         process: Process,
-        protocol_data: Dict,
-        manipulate_data: List[Dict],
+        op_by_id: Dict[str, Dict],
+        def_by_name: Dict[str, Dict],
+        port_keys: Set[Tuple[int, str, str]],
+        port_rows: List[Dict],
         skip_existing: bool = True
     ) -> Dict[str, int]:
-        """1つのProcessのPorts作成（重複チェック付き）"""
+        """1つのProcessのPorts作成（重複チェック付き、作成分はport_rowsとport_keysに追加）"""
         # protocol.yamlからプロセスタイプを取得
-        process_type = None
-        for op in protocol_data.get('operations', []):
-            if op.get('id') == process.name:
-                process_type = op.get('type')
-                break
+        op = op_by_id.get(process.name)
+        process_type = op.get('type') if op else None
 
         if not process_type:
             print(f"Warning: Process type not found for {process.name}")
@@ -102,11 +217,7 @@ class YAMLPortImporter:
             process.process_type = process_type
 
         # manipulate.yamlからポート定義を取得
-        process_def = None
-        for pdef in manipulate_data:
-            if pdef.get('name') == process_type:
-                process_def = pdef
-                break
+        process_def = def_by_name.get(process_type)
 
         if not process_def:
             print(f"Warning: Process definition not found for type {process_type}")
@@ -119,74 +230,86 @@ class YAMLPortImporter:
         for idx, port_def in enumerate(process_def.get('input', [])):
             port_name = port_def.get('id')
 
-            # ★重複チェック: 既存ポートがあるかチェック
-            existing_port = self.session.query(Port).filter(
-                Port.process_id == process.id,
-                Port.port_type == 'input',
-                Port.port_name == port_name
-            ).first()
-
-            if existing_port:
+            # ★重複チェック: 既存ポート・作成予定のポートがあるかチェック
+            key = (process.id, 'input', port_name)
+            if key in port_keys:
                 if skip_existing:
                     skipped_count += 1
                     continue
                 else:
                     raise ValueError(f"Port already exists: process_id={process.id}, port_name={port_name}, port_type=input")
 
-            port = Port(
-                process_id=process.id,
-                port_name=port_name,
-                port_type='input',
-                data_type=port_def.get('type'),
-                position=idx,
-                is_required=True,
-                default_value=yaml.dump(port_def.get('default')) if port_def.get('default') else None,
-                description=port_def.get('description')
-            )
-            self.session.add(port)
+            port_rows.append({
+                'process_id': process.id,
+                'port_name': port_name,
+                'port_type': 'input',
+                'data_type': port_def.get('type'),
+                'position': idx,
+                'is_required': True,
+                'default_value': yaml.dump(port_def.get('default'), Dumper=_YAMLDumper) if port_def.get('default') else None,
+                'description': port_def.get('description')
+            })
+            port_keys.add(key)
             created_count += 1
 
         # 出力ポート作成
         for idx, port_def in enumerate(process_def.get('output', [])):
             port_name = port_def.get('id')
 
-            # ★重複チェック: 既存ポートがあるかチェック
-            existing_port = self.session.query(Port).filter(
-                Port.process_id == process.id,
-                Port.port_type == 'output',
-                Port.port_name == port_name
-            ).first()
-
-            if existing_port:
+            # ★重複チェック: 既存ポート・作成予定のポートがあるかチェック
+            key = (process.id, 'output', port_name)
+            if key in port_keys:
                 if skip_existing:
                     skipped_count += 1
                     continue
                 else:
                     raise ValueError(f"Port already exists: process_id={process.id}, port_name={port_name}, port_type=output")
 
-            port = Port(
-                process_id=process.id,
-                port_name=port_name,
-                port_type='output',
-                data_type=port_def.get('type'),
-                position=idx,
-                is_required=True,
-                default_value=None,
-                description=port_def.get('description')
-            )
-            self.session.add(port)
+            port_rows.append({
+                'process_id': process.id,
+                'port_name': port_name,
+                'port_type': 'output',
+                'data_type': port_def.get('type'),
+                'position': idx,
+                'is_required': True,
+                'default_value': None,
+                'description': port_def.get('description')
+            })
+            port_keys.add(key)
             created_count += 1
 
         return {'created': created_count, 'skipped': skipped_count}
 
+    def _build_port_index(self, processes: List[Process]) -> Dict[Tuple[int, str, str], int]:
+        """
+        プロセス群のポートを1クエリで取得し、検索用インデックスを構築
+
+        Returns:
+            {(process_id, port_name, port_type): port_id}
+        """
+        process_ids = [p.id for p in processes]
+        if not process_ids:
+            return {}
+
+        rows = self.session.query(
+            Port.id, Port.process_id, Port.port_name, Port.port_type
+        ).filter(Port.process_id.in_(process_ids)).all()
+
+        return {
+            (process_id, port_name, port_type): port_id
+            for port_id, process_id, port_name, port_type in rows
+        }
+
     def _import_connections(
         self,
         run_id: int,
         processes: List[Process],
         protocol_data: Dict,
+        port_index: Dict[Tuple[int, str, str], int],
+        connection_rows: List[Dict],
         skip_existing: bool = True
     ) -> Dict[str, int]:
-        """PortConnection作成（重複チェック付き）"""
+        """PortConnection作成（重複チェック付き、作成分はconnection_rowsに追加）"""
         connections = protocol_data.get('connections', [])
         created_count = 0
         skipped_count = 0
@@ -194,6 +317,13 @@ class YAMLPortImporter:
         # プロセス名→Processオブジェクトのマップ
         process_map = {p.name: p for p in processes}
 
+        # このRunの既存接続を一括取得（接続ごとの重複チェッククエリを回避）
+        existing_connections = set(
+            self.session.query(
+                PortConnection.source_port_id, PortConnection.target_port_id
+            ).filter(PortConnection.run_id == run_id).all()
+        )
+
         for conn_def in connections:
             # input側が出力元、output側が入力先
             input_info = conn_def.get('input', [])  # [process_name, port_name]
@@ -215,42 +345,27 @@ class YAMLPortImporter:
                 continue
 
             # ポート取得
-            source_port = self.session.query(Port).filter(
-                Port.process_id == source_process.id,
-                Port.port_name == source_port_name,
-                Port.port_type == 'output'
-            ).first()
-
-            target_port = self.session.query(Port).filter(
-                Port.process_id == target_process.id,
-                Port.port_name == target_port_name,
-                Port.port_type == 'input'
-            ).first()
-
-            if not source_port or not target_port:
+            source_port_id = port_index.get((source_process.id, source_port_name, 'output'))
+            target_port_id = port_index.get((target_process.id, target_port_name, 'input'))
+
+            if not source_port_id or not target_port_id:
                 continue
 
             # ★重複チェック: 既存接続があるかチェック
-            existing_connection = self.session.query(PortConnection).filter(
-                PortConnection.run_id == run_id,
-                PortConnection.source_port_id == source_port.id,
-                PortConnection.target_port_id == target_port.id
-            ).first()
-
-            if existing_connection:
+            if (source_port_id, target_port_id) in existing_connections:
                 if skip_existing:
                     skipped_count += 1
                     continue
                 else:
-                    raise ValueError(f"Connection already exists: run_id={run_id}, source_port_id={source_port.id}, target_port_id={target_port.id}")
+                    raise ValueError(f"Connection already exists: run_id={run_id}, source_port_id={source_port_id}, target_port_id={target_port_id}")
 
             # 接続作成
-            connection = PortConnection(
-                run_id=run_id,
-                source_port_id=source_port.id,
-                target_port_id=target_port.id
-            )
-            self.session.add(connection)
+            connection_rows.append({
+                'run_id': run_id,
+                'source_port_id': source_port_id,
+                'target_port_id': target_port_id
+            })
+            existing_connections.add((source_port_id, target_port_id))
             created_count += 1
 
         return {'created': created_count, 'skipped': skipped_count}
@@ -5,12 +5,25 @@
 """
 
 import json
+import os
+import queue
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+import posixpath
 import zipstream
-from datetime import datetime
-from typing import List, Generator, Dict, Any, Optional
+from typing import Callable, Iterator, List, Generator, Dict, Any, Optional, Tuple
 import logging
 
-from services.s3_service import S3Service
+# orjsonが利用可能ならmanifestの出力に使用（UTF-8のbytesを直接生成でき、標準jsonより高速）
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from services.s3_service import S3Service, STREAM_CHUNK_SIZE
+from services.storage.cache import TTLCache
+from services.zip_writer import StreamingZipFile, ZIP_ZSTANDARD, ZSTD_AVAILABLE
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +32,49 @@ MAX_ZIP_SIZE = 500 * 1024 * 1024  # 500MB
 MAX_SINGLE_FILE_SIZE = 100 * 1024 * 1024  # 100MB
 MAX_RUN_COUNT = 100
 
+# ラン間でS3一覧取得を並列化する際の最大スレッド数
+# S3モードではさらにクライアントの接続プール上限（max_pool_connections）で制限する
+LIST_MAX_WORKERS = 16
+
+# プレフィックスごとの一覧取得結果のキャッシュ
+# サイズ推定→ダウンロードの連続リクエストで同じLISTを繰り返さないために使用
+LISTING_CACHE_TTL = 30  # 秒
+LISTING_CACHE_MAX_ENTRIES = 128
+
+# 後続エントリの先読み件数と、先読み（全体取得）対象とする最大サイズ
+# これより大きいファイルは従来どおりストリーミングで取得する
+PREFETCH_DEPTH = 8
+PREFETCH_MAX_OBJECT_SIZE = 8 * 1024 * 1024  # 8MB
+# 同時取得数と、先読みでメモリに保持する合計サイズの上限
+PREFETCH_MAX_WORKERS = 8
+PREFETCH_MAX_BUFFERED_BYTES = 32 * 1024 * 1024  # 32MB
+
+# ZIP出力のまとめ書きサイズ（ヘッダ等の小さな断片を1回の送信にまとめる）
+ZIP_OUTPUT_BUFFER_SIZE = 64 * 1024  # 64KB
+
+# ストリーミング取得時の読み込みバッファサイズ
+# 大きいほどCRC計算・圧縮呼び出しのオーバーヘッドが償却される
+STREAM_BUFFER_SIZE = STREAM_CHUNK_SIZE
+
+# DEFLATE圧縮レベル（1: 最速）
+# S3 I/Oに律速されるストリーミング経路のため、圧縮率より速度を優先する
+ZIP_COMPRESS_LEVEL = 1
+
+# 圧縮済みのため再圧縮せずSTOREDで格納する拡張子
+STORED_EXTENSIONS = frozenset({
+    '.gz', '.tgz', '.zip', '.zst', '.xz', '.bz2',
+    '.png', '.jpg', '.jpeg', '.webp', '.mp4',
+    '.parquet', '.pdf'
+})
+
+# Zstandardで圧縮するテキスト系拡張子
+ZSTD_EXTENSIONS = frozenset({'.json', '.yaml', '.yml', '.csv', '.log', '.txt'})
+ZSTD_COMPRESS_LEVEL = 3
+
+# ZIPのZstandard圧縮（method 93）は展開側の対応が限られる
+# （Windows/macOS標準の展開機能は非対応）ため、明示的に有効化した場合のみ使用する
+ZIP_USE_ZSTD = os.getenv('ZIP_USE_ZSTD', 'false').lower() == 'true'
+
 
 class ZipServiceError(Exception):
     """ZIPサービスエラーの基底クラス"""
@@ -35,6 +91,200 @@ class RunNotFoundError(ZipServiceError):
     pass
 
 
+def _utc_now() -> Tuple[time.struct_time, int]:
+    """現在のUTC時刻を (struct_time, マイクロ秒) で取得する"""
+    seconds, remainder_ns = divmod(time.time_ns(), 1_000_000_000)
+    return time.gmtime(seconds), remainder_ns // 1000
+
+
+# S3Serviceを既定で生成するインスタンス間で共有するキャッシュ
+# (ストレージモード, バケット名, プレフィックス) -> 一覧（呼び出し側で変更しないこと）
+_shared_listing_cache = TTLCache(LISTING_CACHE_TTL, LISTING_CACHE_MAX_ENTRIES)
+
+
+class _BufferPool:
+    """
+    読み込みバッファのプール
+
+    ストリーミング取得ごとにbytearrayを貸し出し、終了後に回収して再利用する。
+    同時に実行中の取得処理の数だけバッファが確保される。
+    """
+
+    def __init__(self, buffer_size: int):
+        self._buffer_size = buffer_size
+        self._free: queue.SimpleQueue = queue.SimpleQueue()
+
+    @contextmanager
+    def checkout(self) -> Iterator[bytearray]:
+        """バッファを借り出す（with文の終了時に返却）"""
+        try:
+            buffer = self._free.get_nowait()
+        except queue.Empty:
+            buffer = bytearray(self._buffer_size)
+        try:
+            yield buffer
+        finally:
+            self._free.put(buffer)
+
+
+_read_buffers = _BufferPool(STREAM_BUFFER_SIZE)
+
+
+class _ManifestRecorder:
+    """
+    manifest用の情報を列ごとのリスト（SoA）で記録する
+
+    ファイルごとのループでは数値の加算とリストへの追記のみを行い、
+    ラン・エラーごとのdictはmanifest出力時にまとめて生成する。
+    """
+
+    def __init__(self, generated_at: str):
+        self.generated_at = generated_at
+        self.run_ids: List[Any] = []
+        self.file_names: List[str] = []
+        self.statuses: List[str] = []
+        self.file_counts: List[int] = []
+        self.total_sizes: List[int] = []
+        self.error_run_ids: List[Any] = []
+        self.error_messages: List[str] = []
+        self.total_files = 0
+        self.total_size = 0
+
+    def add_run(self, run_id: Any, file_name: str, status: str,
+                file_count: int, total_size: int):
+        """ZIPに追加したランを記録"""
+        self.run_ids.append(run_id)
+        self.file_names.append(file_name)
+        self.statuses.append(status)
+        self.file_counts.append(file_count)
+        self.total_sizes.append(total_size)
+        self.total_files += file_count
+
+    def add_error(self, run_id: Any, message: str):
+        """スキップしたランを記録"""
+        self.error_run_ids.append(run_id)
+        self.error_messages.append(message)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        manifestデータを生成する
+
+        Returns:
+            Dict: generated_at, runs, errors, total_files, total_size
+        """
+        return {
+            'generated_at': self.generated_at,
+            'runs': [
+                {
+                    'run_id': run_id,
+                    'file_name': file_name,
+                    'status': status,
+                    'file_count': file_count,
+                    'total_size': total_size
+                }
+                for run_id, file_name, status, file_count, total_size in zip(
+                    self.run_ids, self.file_names, self.statuses,
+                    self.file_counts, self.total_sizes
+                )
+            ],
+            'errors': [
+                {'run_id': run_id, 'error': message, 'skipped': True}
+                for run_id, message in zip(self.error_run_ids, self.error_messages)
+            ],
+            'total_files': self.total_files,
+            'total_size': self.total_size
+        }
+
+    def to_json(self) -> bytes:
+        """
+        manifestをJSON（indent=2）としてシリアライズする
+
+        出力は json.dumps(manifest, indent=2, ensure_ascii=False) をUTF-8にしたものと同一。
+
+        Returns:
+            bytes: UTF-8エンコードされたJSON
+        """
+        if orjson is not None:
+            return orjson.dumps(self.to_dict(), option=orjson.OPT_INDENT_2)
+        return json.dumps(self.to_dict(), indent=2, ensure_ascii=False).encode('utf-8')
+
+    def iter_json(self) -> Generator[bytes, None, None]:
+        """
+        manifestをJSONとして出力する（生成は最初のチャンク要求時まで遅延）
+
+        Yields:
+            bytes: UTF-8エンコードされたJSON
+        """
+        yield self.to_json()
+
+
+class _ObjectPrefetcher:
+    """
+    ZIPへの書き込み順にオブジェクトを先読みする
+
+    現在のエントリを圧縮・出力している間に後続のオブジェクトを複数並列で
+    バックグラウンド取得し、エントリ間のS3往復待ちを隠蔽する。
+    取得は順不同で完了するが、ZIPへは登録順に取り出す。
+    先読み中の合計サイズはmax_buffered_bytesで制限する。
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str], bytes],
+        depth: int = PREFETCH_DEPTH,
+        max_object_size: int = PREFETCH_MAX_OBJECT_SIZE,
+        max_workers: int = PREFETCH_MAX_WORKERS,
+        max_buffered_bytes: int = PREFETCH_MAX_BUFFERED_BYTES
+    ):
+        self._fetch = fetch
+        self._depth = depth
+        self._max_object_size = max_object_size
+        self._max_workers = max_workers
+        self._max_buffered_bytes = max_buffered_bytes
+        self._entries: List[Tuple[str, int]] = []
+        self._futures: Dict[int, Future] = {}
+        self._buffered_bytes = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def add(self, key: str, size: int) -> int:
+        """エントリを登録し、書き込み順の位置を返す"""
+        self._entries.append((key, size))
+        return len(self._entries) - 1
+
+    def take(self, position: int) -> Optional[Future]:
+        """
+        指定位置のエントリの取得Futureを取り出し、後続エントリの先読みを発行する
+
+        Returns:
+            先読み対象外（大きいファイル）の場合はNone
+        """
+        end = min(position + self._depth + 1, len(self._entries))
+        for i in range(position, end):
+            key, size = self._entries[i]
+            if i in self._futures or size > self._max_object_size:
+                continue
+            # 上限を超える場合は以降の先読みを次回に回す（現在のエントリは常に取得）
+            if i != position and self._buffered_bytes + size > self._max_buffered_bytes:
+                break
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._max_workers)
+            self._futures[i] = self._executor.submit(self._fetch, key)
+            self._buffered_bytes += size
+
+        future = self._futures.pop(position, None)
+        if future is not None:
+            self._buffered_bytes -= self._entries[position][1]
+        return future
+
+    def close(self) -> None:
+        """未消費の先読みを破棄する"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._futures.clear()
+        self._buffered_bytes = 0
+
+
 class ZipStreamService:
     """
     ストリーミングZIP生成サービス
@@ -51,6 +301,11 @@ class ZipStreamService:
             s3_service: S3サービスインスタンス（テスト用にDI可能）
         """
         self.s3_service = s3_service or S3Service()
+        # 注入されたサービスの一覧結果は他のインスタンスと共有しない
+        self._listing_cache = (
+            _shared_listing_cache if s3_service is None
+            else TTLCache(LISTING_CACHE_TTL, LISTING_CACHE_MAX_ENTRIES)
+        )
 
     def create_zip_stream(
         self,
@@ -60,16 +315,19 @@ class ZipStreamService:
         """
         ZIPストリームを生成する
 
+        上限チェックはストリーム開始前（本メソッドの呼び出し時）に行うため、
+        上限超過時はレスポンスボディを送信する前に例外が送出される。
+
         Args:
             runs: ランオブジェクトリスト
                 各要素: {'id': int, 'storage_address': str, 'file_name': str, 'status': str}
             include_manifest: manifestファイルを含めるか
 
-        Yields:
-            bytes: ZIPストリームチャンク
+        Returns:
+            Generator[bytes]: ZIPストリームチャンクのジェネレータ
 
         Raises:
-            SizeLimitExceededError: サイズ制限超過時
+            SizeLimitExceededError: ラン数または合計サイズの上限超過時
             RunNotFoundError: ランが見つからない時
         """
         if len(runs) > MAX_RUN_COUNT:
@@ -77,54 +335,89 @@ class ZipStreamService:
                 f"ラン数が上限（{MAX_RUN_COUNT}件）を超えています"
             )
 
+        # S3一覧取得はレイテンシ律速のため、全ランの分を先に並列で発行する
+        prefixes = [
+            run['storage_address'].rstrip('/') + '/'
+            for run in runs if run.get('storage_address')
+        ]
+        listings = self._list_prefixes_concurrently(prefixes)
+
+        # 合計サイズの事前チェック（一覧取得に失敗したランはストリーム側でerrorsに記録する）
+        total_size = 0
+        for prefix in prefixes:
+            try:
+                total_size += sum(obj['Size'] for obj in listings[prefix].result())
+            except Exception:
+                continue
+        if total_size > MAX_ZIP_SIZE:
+            raise SizeLimitExceededError(
+                f"合計サイズ（{total_size // (1024*1024)}MB）が"
+                f"上限（{MAX_ZIP_SIZE // (1024*1024)}MB）を超えています"
+            )
+
+        return self._generate_zip_stream(runs, listings, include_manifest)
+
+    def _generate_zip_stream(
+        self,
+        runs: List[Dict[str, Any]],
+        listings: Dict[str, Future],
+        include_manifest: bool
+    ) -> Generator[bytes, None, None]:
+        """
+        一覧取得済みのランからZIPストリームを生成する
+
+        Args:
+            runs: ランオブジェクトリスト
+            listings: プレフィックス → 一覧取得Futureの辞書
+            include_manifest: manifestファイルを含めるか
+
+        Yields:
+            bytes: ZIPストリームチャンク
+        """
         # ZIPストリームを作成
-        z = zipstream.ZipFile(mode='w', compression=zipstream.ZIP_DEFLATED)
+        z = StreamingZipFile(
+            mode='w',
+            compression=zipstream.ZIP_DEFLATED,
+            compresslevel=ZIP_COMPRESS_LEVEL,
+            output_buffer_size=ZIP_OUTPUT_BUFFER_SIZE
+        )
 
         # manifest用のデータ収集
-        manifest_data = {
-            'generated_at': datetime.utcnow().isoformat() + 'Z',
-            'runs': [],
-            'errors': [],
-            'total_files': 0,
-            'total_size': 0
-        }
+        now, now_us = _utc_now()
+        manifest = _ManifestRecorder(
+            generated_at=f"{time.strftime('%Y-%m-%dT%H:%M:%S', now)}.{now_us:06d}Z"
+        )
+
+        prefetcher = _ObjectPrefetcher(self._read_object)
 
         # 各ランを処理
         for run in runs:
+            # ランの属性はループ先頭で一度だけ取り出す
             run_id = run.get('id')
             storage_address = run.get('storage_address', '')
+            file_name = run.get('file_name', '')
+            status = run.get('status', '')
 
             if not storage_address:
                 logger.warning(f"Run {run_id}: storage_address is empty, skipping")
-                manifest_data['errors'].append({
-                    'run_id': run_id,
-                    'error': 'storage_address is empty',
-                    'skipped': True
-                })
+                manifest.add_error(run_id, 'storage_address is empty')
                 continue
 
             try:
                 # S3からファイル一覧を取得
                 prefix = storage_address.rstrip('/') + '/'
-                objects = self.s3_service.list_objects_recursive(prefix)
+                objects = listings[prefix].result()
 
                 if not objects:
                     logger.warning(f"Run {run_id}: No files found at {prefix}")
-                    manifest_data['errors'].append({
-                        'run_id': run_id,
-                        'error': 'No files found',
-                        'skipped': True
-                    })
+                    manifest.add_error(run_id, 'No files found')
                     continue
 
-                # サイズチェック
                 total_run_size = sum(obj['Size'] for obj in objects)
-                if manifest_data['total_size'] + total_run_size > MAX_ZIP_SIZE:
-                    raise SizeLimitExceededError(
-                        f"合計サイズが上限（{MAX_ZIP_SIZE // (1024*1024)}MB）を超えます"
-                    )
-
                 run_file_count = 0
+                run_added_size = 0
+                prefix_len = len(prefix)
+                zip_dir = f"run_{run_id}/"
 
                 # 各ファイルをZIPに追加
                 for obj in objects:
@@ -140,46 +433,134 @@ class ZipStreamService:
 
                     # ZIP内のパスを決定
                     # storage_address以降の相対パスを使用
-                    relative_path = key[len(prefix):]
-                    zip_path = f"run_{run_id}/{relative_path}"
+                    zip_path = zip_dir + key[prefix_len:]
 
                     # ファイルコンテンツのジェネレータを作成
+                    compress_type, compresslevel = self._select_compression(key)
+                    position = prefetcher.add(key, size)
                     z.write_iter(
                         zip_path,
-                        self._file_content_generator(key)
+                        self._entry_content_generator(prefetcher, position, key),
+                        compress_type=compress_type,
+                        compresslevel=compresslevel
                     )
 
                     run_file_count += 1
-                    manifest_data['total_size'] += size
+                    run_added_size += size
 
                 # manifest用のラン情報を記録
-                manifest_data['runs'].append({
-                    'run_id': run_id,
-                    'file_name': run.get('file_name', ''),
-                    'status': run.get('status', ''),
-                    'file_count': run_file_count,
-                    'total_size': total_run_size
-                })
-                manifest_data['total_files'] += run_file_count
-
-            except SizeLimitExceededError:
-                raise
+                manifest.total_size += run_added_size
+                manifest.add_run(run_id, file_name, status, run_file_count, total_run_size)
+
             except Exception as e:
                 logger.error(f"Run {run_id}: Error processing - {e}")
-                manifest_data['errors'].append({
-                    'run_id': run_id,
-                    'error': str(e),
-                    'skipped': True
-                })
+                manifest.add_error(run_id, str(e))
 
         # manifestファイルを追加
         if include_manifest:
-            manifest_json = json.dumps(manifest_data, indent=2, ensure_ascii=False)
-            z.writestr('manifest.json', manifest_json.encode('utf-8'))
+            z.write_iter('manifest.json', manifest.iter_json())
 
         # ZIPストリームを出力
-        for chunk in z:
-            yield chunk
+        try:
+            for chunk in z:
+                yield chunk
+        finally:
+            prefetcher.close()
+
+    def _list_prefixes_concurrently(self, prefixes: List[str]) -> Dict[str, Future]:
+        """
+        複数プレフィックスのオブジェクト一覧を並列に取得する
+
+        Args:
+            prefixes: S3プレフィックスリスト
+
+        Returns:
+            プレフィックス → 一覧取得Futureの辞書（例外はresult()時に送出される）
+        """
+        unique_prefixes = list(dict.fromkeys(prefixes))
+        if not unique_prefixes:
+            return {}
+
+        max_workers = min(LIST_MAX_WORKERS, len(unique_prefixes))
+        pool_size = self.s3_service.max_pool_connections
+        if pool_size is not None:
+            max_workers = max(1, min(max_workers, pool_size))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return {
+                prefix: executor.submit(self._list_prefix, prefix)
+                for prefix in unique_prefixes
+            }
+
+    def _list_prefix(self, prefix: str) -> List[Dict[str, Any]]:
+        """
+        プレフィックス配下のオブジェクト一覧を取得する（TTLキャッシュ付き）
+
+        Args:
+            prefix: S3プレフィックス
+
+        Returns:
+            オブジェクト情報リスト（各要素: {'Key', 'Size', ...}）
+        """
+        # 接続先（モード・バケット）ごとに区別する
+        cache_key = (*self.s3_service.cache_scope, prefix)
+        objects = self._listing_cache.get(cache_key)
+        if objects is None:
+            objects = self.s3_service.list_objects_recursive(prefix)
+            self._listing_cache.put(cache_key, objects)
+        return objects
+
+    def _select_compression(self, key: str) -> Tuple[int, Optional[int]]:
+        """
+        拡張子からエントリの圧縮方式を選択する
+
+        Args:
+            key: S3キー
+
+        Returns:
+            (圧縮方式, 圧縮レベル) のタプル
+        """
+        ext = posixpath.splitext(key)[1].lower()
+        if ext in STORED_EXTENSIONS:
+            return zipstream.ZIP_STORED, None
+        if ext in ZSTD_EXTENSIONS and ZIP_USE_ZSTD and ZSTD_AVAILABLE:
+            return ZIP_ZSTANDARD, ZSTD_COMPRESS_LEVEL
+        return zipstream.ZIP_DEFLATED, ZIP_COMPRESS_LEVEL
+
+    def _read_object(self, key: str) -> bytes:
+        """オブジェクト全体を取得する（先読み用）"""
+        return b''.join(self.s3_service.get_object_stream(key))
+
+    def _entry_content_generator(
+        self,
+        prefetcher: _ObjectPrefetcher,
+        position: int,
+        key: str
+    ) -> Generator[bytes, None, None]:
+        """
+        ZIPエントリのコンテンツを返すジェネレータ
+
+        先読み済みであればその結果を、そうでなければストリーミングで取得する。
+
+        Args:
+            prefetcher: 先読み管理
+            position: エントリの書き込み順の位置
+            key: S3キー
+
+        Yields:
+            bytes: ファイルチャンク
+        """
+        future = prefetcher.take(position)
+        if future is None:
+            yield from self._file_content_generator(key)
+            return
+
+        try:
+            content = future.result()
+        except Exception as e:
+            logger.error(f"Error reading file {key}: {e}")
+            # 空のファイルとして処理
+            content = b''
+        yield content
 
     def _file_content_generator(self, key: str) -> Generator[bytes, None, None]:
         """
@@ -192,8 +573,10 @@ class ZipStreamService:
             bytes: ファイルチャンク
         """
         try:
-            for chunk in self.s3_service.get_object_stream(key):
-                yield chunk
+            # 共有バッファに読み込んだビューを返す（ZIPライターが即座に消費する）
+            with _read_buffers.checkout() as buffer:
+                for chunk in self.s3_service.get_object_stream_into(key, buffer):
+                    yield chunk
         except Exception as e:
             logger.error(f"Error reading file {key}: {e}")
             # 空のファイルとして処理
@@ -213,14 +596,22 @@ class ZipStreamService:
         total_size = 0
         run_map = {run['id']: run for run in runs_data}
 
+        targets = []
         for run_id in run_ids:
             run = run_map.get(run_id)
             if not run or not run.get('storage_address'):
                 continue
+            targets.append((run_id, run['storage_address'].rstrip('/') + '/'))
+
+        if not targets:
+            return 0
+
+        # 一覧はcreate_zip_streamと共有のキャッシュ経由で取得し、LISTを1回に抑える
+        listings = self._list_prefixes_concurrently([prefix for _, prefix in targets])
 
-            prefix = run['storage_address'].rstrip('/') + '/'
+        for run_id, prefix in targets:
             try:
-                total_size += self.s3_service.calculate_total_size(prefix)
+                total_size += sum(obj['Size'] for obj in listings[prefix].result())
             except Exception as e:
                 logger.warning(f"Could not calculate size for run {run_id}: {e}")
 
@@ -233,5 +624,5 @@ class ZipStreamService:
         Returns:
             str: ファイル名（例: labcode_runs_20251221_120000.zip）
         """
-        timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+        timestamp = time.strftime('%Y%m%d_%H%M%S', _utc_now()[0])
         return f"labcode_runs_{timestamp}.zip"
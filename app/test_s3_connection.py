@@ -2,9 +2,19 @@
 """S3接続テストスクリプト"""
 
 import os
+from datetime import datetime, timezone
+
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError, NoCredentialsError
 
+# 接続テスト中の一連のAPI呼び出しでTCP/TLS接続を使い回す
+S3_CLIENT_CONFIG = Config(
+    max_pool_connections=10,
+    retries={'max_attempts': 3, 'mode': 'standard'},
+    tcp_keepalive=True
+)
+
 def test_s3_connection():
     """S3への接続をテストする"""
     print("=" * 60)
@@ -35,7 +45,8 @@ def test_s3_connection():
             's3',
             aws_access_key_id=access_key,
             aws_secret_access_key=secret_key,
-            region_name=region
+            region_name=region,
+            config=S3_CLIENT_CONFIG
         )
         print("✅ S3クライアント作成成功")
 
@@ -86,7 +97,7 @@ def test_s3_connection():
         # テストファイルアップロード
         print("\n🔍 テストファイルのアップロードを試行中...")
         test_key = "test/connection_test.txt"
-        test_content = f"S3接続テスト成功 - LabCode\nタイムスタンプ: {os.popen('date').read().strip()}"
+        test_content = f"S3接続テスト成功 - LabCode\nタイムスタンプ: {datetime.now(timezone.utc).isoformat(timespec='seconds')}"
         s3_client.put_object(
             Bucket=bucket_name,
             Key=test_key,
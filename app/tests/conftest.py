@@ -0,0 +1,51 @@
+"""
+テスト共通フィクスチャ
+
+テストはインメモリSQLiteを使用し、本番DB（/data/sql_app.db）には接続しない。
+"""
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+import define_db.models  # noqa: F401  テーブル定義をBase.metadataに登録
+from define_db.database import Base
+
+
+@pytest.fixture(scope="session")
+def db_engine():
+    """テスト用インメモリDBエンジン（スキーマはセッション内で1回のみ作成）"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+
+    # pysqliteの暗黙トランザクション制御を無効化し、SAVEPOINTを正しく動作させる
+    @event.listens_for(engine, "connect")
+    def do_connect(dbapi_conn, connection_record):
+        dbapi_conn.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def do_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="function")
+def test_db(db_engine):
+    """テスト用DBセッション
+
+    外側のトランザクション内でcommitをSAVEPOINTとして扱い、
+    テスト終了時にロールバックすることでテスト間を分離する。
+    """
+    connection = db_engine.connect()
+    transaction = connection.begin()
+    session = Session(bind=connection, join_transaction_mode="create_savepoint")
+    yield session
+    session.close()
+    transaction.rollback()
+    connection.close()
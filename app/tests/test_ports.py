@@ -1,34 +1,32 @@
 """
 Portsテーブル関連のテストコード
 """
-import pytest
 from sqlalchemy.orm import Session
 from define_db.models import User, Project, Run, Process, Port, PortConnection
-from define_db.database import SessionLocal, engine, Base
 from datetime import datetime
+import io
 
+from services.yaml_importer import YAMLPortImporter
 
-@pytest.fixture(scope="function")
-def test_db():
-    """テスト用DB作成"""
-    Base.metadata.create_all(bind=engine)
-    session = SessionLocal()
-    yield session
-    session.close()
-    Base.metadata.drop_all(bind=engine)
+
+def save_prerequisites(session: Session, rows: list):
+    """前提データ（User/Project/Run）と追加の行をまとめて一括登録"""
+    now = datetime.now()
+    session.bulk_save_objects([
+        User(id=1, email="test@example.com"),
+        Project(id=1, name="Test Project", user_id=1, created_at=now, updated_at=now),
+        Run(id=1, project_id=1, file_name="test.yaml", checksum="abc", user_id=1,
+            added_at=now, status="running", storage_address="/data/runs/1"),
+        *rows
+    ])
 
 
 def test_port_creation(test_db: Session):
     """Port作成テスト"""
     # 前提データ作成
-    user = User(id=1, email="test@example.com")
-    project = Project(id=1, name="Test Project", user_id=1, created_at=datetime.now(), updated_at=datetime.now())
-    run = Run(id=1, project_id=1, file_name="test.yaml", checksum="abc", user_id=1,
-              added_at=datetime.now(), status="running", storage_address="/data/runs/1")
-    process = Process(id=1, name="serve_plate1", run_id=1, storage_address="/data/processes/1")
-
-    test_db.add_all([user, project, run, process])
-    test_db.commit()
+    save_prerequisites(test_db, [
+        Process(id=1, name="serve_plate1", run_id=1, storage_address="/data/processes/1")
+    ])
 
     # Port作成
     port = Port(
@@ -52,17 +50,12 @@ def test_port_creation(test_db: Session):
 def test_port_connection_creation(test_db: Session):
     """PortConnection作成テスト"""
     # 前提データ作成
-    user = User(id=1, email="test@example.com")
-    project = Project(id=1, name="Test Project", user_id=1, created_at=datetime.now(), updated_at=datetime.now())
-    run = Run(id=1, project_id=1, file_name="test.yaml", checksum="abc", user_id=1,
-              added_at=datetime.now(), status="running", storage_address="/data/runs/1")
-    process1 = Process(id=1, name="serve_plate1", run_id=1, storage_address="/data/processes/1")
-    process2 = Process(id=2, name="dispense_liquid1", run_id=1, storage_address="/data/processes/2")
-    port1 = Port(id=1, process_id=1, port_name="value", port_type="output", data_type="Plate96", position=0, is_required=True)
-    port2 = Port(id=2, process_id=2, port_name="in1", port_type="input", data_type="Plate96", position=0, is_required=True)
-
-    test_db.add_all([user, project, run, process1, process2, port1, port2])
-    test_db.commit()
+    save_prerequisites(test_db, [
+        Process(id=1, name="serve_plate1", run_id=1, storage_address="/data/processes/1"),
+        Process(id=2, name="dispense_liquid1", run_id=1, storage_address="/data/processes/2"),
+        Port(id=1, process_id=1, port_name="value", port_type="output", data_type="Plate96", position=0, is_required=True),
+        Port(id=2, process_id=2, port_name="in1", port_type="input", data_type="Plate96", position=0, is_required=True)
+    ])
 
     # Connection作成
     connection = PortConnection(
@@ -83,20 +76,49 @@ def test_port_connection_creation(test_db: Session):
 def test_cascade_delete_process_to_ports(test_db: Session):
     """CASCADE DELETE: Process削除→Port削除"""
     # 前提データ作成
-    user = User(id=1, email="test@example.com")
-    project = Project(id=1, name="Test Project", user_id=1, created_at=datetime.now(), updated_at=datetime.now())
-    run = Run(id=1, project_id=1, file_name="test.yaml", checksum="abc", user_id=1,
-              added_at=datetime.now(), status="running", storage_address="/data/runs/1")
-    process = Process(id=1, name="serve_plate1", run_id=1, storage_address="/data/processes/1")
-    port = Port(id=1, process_id=1, port_name="value", port_type="output", data_type="Plate96", position=0, is_required=True)
-
-    test_db.add_all([user, project, run, process, port])
+    save_prerequisites(test_db, [
+        Process(id=1, name="serve_plate1", run_id=1, storage_address="/data/processes/1"),
+        Port(id=1, process_id=1, port_name="value", port_type="output", data_type="Plate96", position=0, is_required=True)
+    ])
     test_db.commit()
 
     # Process削除
+    process = test_db.get(Process, 1)
     test_db.delete(process)
     test_db.commit()
 
     # Port削除確認
     retrieved_port = test_db.query(Port).filter(Port.id == 1).first()
     assert retrieved_port is None
+
+
+def test_yaml_import_skips_duplicate_port_ids(test_db: Session):
+    """YAMLインポート: 定義内で重複したポートidは1件のみ作成し、残りはスキップ"""
+    save_prerequisites(test_db, [
+        Process(id=1, name="serve_plate1", run_id=1, storage_address="/data/processes/1")
+    ])
+    test_db.commit()
+
+    protocol = b"operations:\n  - id: serve_plate1\n    type: ServePlate96\nconnections: []\n"
+    manipulate = (
+        b"- name: ServePlate96\n"
+        b"  input:\n"
+        b"    - {id: in1, type: Plate96}\n"
+        b"    - {id: in1, type: Plate96}\n"
+        b"  output:\n"
+        b"    - {id: value, type: Plate96}\n"
+        b"    - {id: value, type: Plate96}\n"
+    )
+
+    importer = YAMLPortImporter(test_db)
+    result = importer.import_from_streams(1, io.BytesIO(protocol), io.BytesIO(manipulate))
+    assert result["ports_created"] == 2
+    assert result["ports_skipped"] == 2
+
+    ports = test_db.query(Port.port_type, Port.port_name).filter(Port.process_id == 1).all()
+    assert sorted(ports) == [("input", "in1"), ("output", "value")]
+
+    # 再実行時は既存ポートとしてすべてスキップされる
+    result = importer.import_from_streams(1, io.BytesIO(protocol), io.BytesIO(manipulate))
+    assert result["ports_created"] == 0
+    assert result["ports_skipped"] == 4
@@ -0,0 +1,86 @@
+"""
+StreamingZipFileのテストコード
+
+生成したZIPを標準のzipfileで読み戻し、内容・CRCが一致することを確認する。
+"""
+import io
+import os
+import zipfile
+
+from zipstream import ZIP_STORED, ZIP_DEFLATED
+
+from services.zip_writer import StreamingZipFile
+
+
+def read_back(archive: StreamingZipFile) -> dict:
+    """ストリームを連結してzipfileで読み戻し、アーカイブ名 -> 内容の辞書を返す"""
+    data = b''.join(archive)
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        assert zf.testzip() is None
+        return {info.filename: zf.read(info.filename) for info in zf.infolist()}
+
+
+def iter_reused_buffer(payload: bytes, chunk_size: int):
+    """同じバッファを上書きしながらmemoryviewを返す（load_stream_intoと同じ使い方）"""
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    for i in range(0, len(payload), chunk_size):
+        chunk = payload[i:i + chunk_size]
+        buffer[:len(chunk)] = chunk
+        yield view[:len(chunk)]
+
+
+def test_deflate_round_trip():
+    """DEFLATEエントリを読み戻せること"""
+    payload = b'deflate me ' * 10000
+    archive = StreamingZipFile(mode='w', compression=ZIP_DEFLATED)
+    archive.write_iter('data/deflate.txt', iter([payload[:4096], payload[4096:]]))
+    archive.writestr('data/small.txt', b'hello', compresslevel=9)
+
+    assert read_back(archive) == {
+        'data/deflate.txt': payload,
+        'data/small.txt': b'hello',
+    }
+
+
+def test_stored_with_reused_buffer():
+    """再利用バッファのmemoryviewを渡してもSTOREDエントリが壊れないこと"""
+    payload = os.urandom(10000)
+    archive = StreamingZipFile(mode='w', compression=ZIP_STORED)
+    archive.write_iter('stored.bin', iter_reused_buffer(payload, 1024))
+
+    assert read_back(archive) == {'stored.bin': payload}
+
+
+def test_empty_entry():
+    """空のエントリを書き込めること"""
+    archive = StreamingZipFile(mode='w', compression=ZIP_DEFLATED)
+    archive.write_iter('empty.txt', iter([]))
+    archive.writestr('empty_stored.txt', b'', compress_type=ZIP_STORED)
+
+    assert read_back(archive) == {'empty.txt': b'', 'empty_stored.txt': b''}
+
+
+def test_output_buffer_size():
+    """output_buffer_size指定時に小さなチャンクがまとめられ、内容は変わらないこと"""
+    entries = {f'file_{i}.txt': f'content {i}'.encode() for i in range(100)}
+    archive = StreamingZipFile(mode='w', compression=ZIP_DEFLATED, output_buffer_size=4096)
+    for name, content in entries.items():
+        archive.writestr(name, content)
+
+    chunks = list(archive)
+    assert len(chunks) > 1
+    # 最後のチャンク以外はバッファサイズ以上にまとめられている
+    assert all(len(chunk) >= 4096 for chunk in chunks[:-1])
+    with zipfile.ZipFile(io.BytesIO(b''.join(chunks))) as zf:
+        assert {name: zf.read(name) for name in zf.namelist()} == entries
+
+
+def test_write_local_file(tmp_path):
+    """write()でローカルファイルを追加できること"""
+    path = tmp_path / 'local.txt'
+    path.write_bytes(b'local file\n' * 100)
+    archive = StreamingZipFile(mode='w', compression=ZIP_DEFLATED)
+    archive.write(str(path), arcname='local.txt')
+
+    assert read_back(archive) == {'local.txt': path.read_bytes()}
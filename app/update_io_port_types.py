@@ -27,8 +27,8 @@ from pathlib import Path
 
 sys.path.append("/app")
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import and_, create_engine, func
+from sqlalchemy.orm import aliased, sessionmaker
 from define_db.models import Port, PortConnection, Process
 
 DB_PATH = "/data/sql_app.db"
@@ -36,6 +36,50 @@ engine = create_engine(f"sqlite:///{DB_PATH}")
 SessionLocal = sessionmaker(bind=engine)
 
 
+def query_io_ports(session, process_name, port_name, own_port_col, peer_port_col):
+    """
+    input/outputプロセスのポートと最初の接続相手を1クエリで取得
+
+    Args:
+        session: DBセッション
+        process_name: プロセス名（"input" または "output"）
+        port_name: 対象ポート名（ポート方向と同じ）
+        own_port_col: 対象ポート側の接続カラム
+        peer_port_col: 接続相手側の接続カラム
+
+    Returns:
+        (process, port, peer_port, peer_process_name) のリスト
+        ポート・接続がない場合は該当要素がNone
+    """
+    # ポートごとの最初の接続
+    first_conn = (
+        session.query(
+            own_port_col.label("port_id"),
+            func.min(PortConnection.id).label("conn_id")
+        )
+        .group_by(own_port_col)
+        .subquery()
+    )
+    PeerPort = aliased(Port)
+    PeerProcess = aliased(Process)
+
+    return (
+        session.query(Process, Port, PeerPort, PeerProcess.name)
+        .outerjoin(Port, and_(
+            Port.process_id == Process.id,
+            Port.port_name == port_name,
+            Port.port_type == port_name
+        ))
+        .outerjoin(first_conn, first_conn.c.port_id == Port.id)
+        .outerjoin(PortConnection, PortConnection.id == first_conn.c.conn_id)
+        .outerjoin(PeerPort, PeerPort.id == peer_port_col)
+        .outerjoin(PeerProcess, PeerProcess.id == PeerPort.process_id)
+        .filter(Process.name == process_name)
+        .order_by(Process.id)
+        .all()
+    )
+
+
 def update_io_port_types():
     """input/outputプロセスのポート型を更新"""
     session = SessionLocal()
@@ -47,18 +91,12 @@ def update_io_port_types():
 
         # inputプロセスのoutputポートを更新
         print("--- inputプロセスのoutputポート ---\n")
-        input_processes = session.query(Process).filter(
-            Process.name == "input"
-        ).all()
-
-        for process in input_processes:
-            # outputポートを取得
-            output_port = session.query(Port).filter(
-                Port.process_id == process.id,
-                Port.port_name == "output",
-                Port.port_type == "output"
-            ).first()
+        input_rows = query_io_ports(
+            session, "input", "output",
+            PortConnection.source_port_id, PortConnection.target_port_id
+        )
 
+        for process, output_port, target_port, target_process_name in input_rows:
             if not output_port:
                 print(f"Run {process.run_id}: outputポートが見つかりません\n")
                 continue
@@ -66,34 +104,19 @@ def update_io_port_types():
             print(f"Run {process.run_id}, Process 'input' (ID: {process.id}):")
             print(f"  - output (ID: {output_port.id}): {output_port.data_type}")
 
-            # 接続先を確認して型を推測
-            connections = session.query(PortConnection).filter(
-                PortConnection.source_port_id == output_port.id
-            ).all()
-
+            # 最初の接続先から型を推測
             inferred_type = None
-            if connections:
-                # 最初の接続先を確認
-                first_conn = connections[0]
-                target_port = session.query(Port).filter(
-                    Port.id == first_conn.target_port_id
-                ).first()
-
-                if target_port:
-                    target_process = session.query(Process).filter(
-                        Process.id == target_port.process_id
-                    ).first()
-
-                    print(f"    接続先: {target_process.name if target_process else 'Unknown'}.{target_port.port_name}")
-
-                    # ポート名から型を推測
-                    if target_port.port_name == "volume":
-                        inferred_type = "Array[Float]"
-                    elif target_port.port_name == "channel":
-                        inferred_type = "Integer"
-                    elif target_port.data_type and target_port.data_type != "Unknown":
-                        # ターゲットポートの型を使用
-                        inferred_type = target_port.data_type
+            if target_port:
+                print(f"    接続先: {target_process_name or 'Unknown'}.{target_port.port_name}")
+
+                # ポート名から型を推測
+                if target_port.port_name == "volume":
+                    inferred_type = "Array[Float]"
+                elif target_port.port_name == "channel":
+                    inferred_type = "Integer"
+                elif target_port.data_type and target_port.data_type != "Unknown":
+                    # ターゲットポートの型を使用
+                    inferred_type = target_port.data_type
 
             if not inferred_type:
                 # デフォルトでArray[Float]を使用（volumeが最も一般的）
@@ -110,18 +133,12 @@ def update_io_port_types():
 
         # outputプロセスのinputポートを更新
         print("\n--- outputプロセスのinputポート ---\n")
-        output_processes = session.query(Process).filter(
-            Process.name == "output"
-        ).all()
-
-        for process in output_processes:
-            # inputポートを取得
-            input_port = session.query(Port).filter(
-                Port.process_id == process.id,
-                Port.port_name == "input",
-                Port.port_type == "input"
-            ).first()
+        output_rows = query_io_ports(
+            session, "output", "input",
+            PortConnection.target_port_id, PortConnection.source_port_id
+        )
 
+        for process, input_port, source_port, source_process_name in output_rows:
             if not input_port:
                 print(f"Run {process.run_id}: inputポートが見つかりません\n")
                 continue
@@ -129,29 +146,14 @@ def update_io_port_types():
             print(f"Run {process.run_id}, Process 'output' (ID: {process.id}):")
             print(f"  - input (ID: {input_port.id}): {input_port.data_type}")
 
-            # 接続元を確認して型を推測
-            connections = session.query(PortConnection).filter(
-                PortConnection.target_port_id == input_port.id
-            ).all()
-
+            # 最初の接続元から型を推測
             inferred_type = None
-            if connections:
-                # 最初の接続元を確認
-                first_conn = connections[0]
-                source_port = session.query(Port).filter(
-                    Port.id == first_conn.source_port_id
-                ).first()
-
-                if source_port:
-                    source_process = session.query(Process).filter(
-                        Process.id == source_port.process_id
-                    ).first()
-
-                    print(f"    接続元: {source_process.name if source_process else 'Unknown'}.{source_port.port_name}")
-
-                    # ソースポートの型を使用
-                    if source_port.data_type and source_port.data_type != "Unknown":
-                        inferred_type = source_port.data_type
+            if source_port:
+                print(f"    接続元: {source_process_name or 'Unknown'}.{source_port.port_name}")
+
+                # ソースポートの型を使用
+                if source_port.data_type and source_port.data_type != "Unknown":
+                    inferred_type = source_port.data_type
 
             if not inferred_type:
                 # デフォルトでSpread[Array[Float]]を使用（protocol.yamlのoutput.data）
@@ -6,6 +6,8 @@ manipulate.yamlから型定義を読み込み、
 data_type="Unknown"となっているポートを正しい型に更新します。
 """
 
+from sqlalchemy import bindparam, update
+
 from define_db.database import SessionLocal
 from define_db.models import Port, Process
 from services.port_type_mapper import get_port_type_mapper
@@ -17,8 +19,19 @@ def update_unknown_port_types():
     type_mapper = get_port_type_mapper()
 
     with SessionLocal() as session:
-        # data_type="Unknown"のすべてのポートを取得
-        unknown_ports = session.query(Port).filter(Port.data_type == "Unknown").all()
+        # data_type="Unknown"のすべてのポートを所属プロセス情報とともに取得
+        unknown_ports = session.query(
+            Port.id,
+            Port.port_name,
+            Port.port_type,
+            Port.position,
+            Process.name.label("process_name"),
+            Process.process_type
+        ).outerjoin(
+            Process, Process.id == Port.process_id
+        ).filter(
+            Port.data_type == "Unknown"
+        ).order_by(Port.id).all()
 
         total_ports = len(unknown_ports)
         updated_count = 0
@@ -29,25 +42,27 @@ def update_unknown_port_types():
         print(f"{'='*60}")
         print(f"Found {total_ports} ports with 'Unknown' type\n")
 
-        for port in unknown_ports:
-            # プロセス情報を取得
-            process = session.query(Process).filter(Process.id == port.process_id).first()
+        # 更新内容を集めて1つのUPDATE（executemany）で反映する
+        update_rows = []
 
-            if not process or not process.process_type:
+        for port in unknown_ports:
+            if not port.process_type:
                 print(f"Port {port.id:4d} ({port.port_name:20s}): ⏭️  Process type not available")
                 skipped_count += 1
                 continue
 
+            port_name = port.port_name
+
             # manipulate.yamlから型を取得
             port_type = type_mapper.get_port_type(
-                process.process_type,
-                port.port_name,
+                port.process_type,
+                port_name,
                 port.port_type
             )
 
             if port_type == "Unknown":
                 # YAML定義から型を推測できない場合、全ポート定義から推測
-                all_ports = type_mapper.get_all_ports_for_process(process.process_type)
+                all_ports = type_mapper.get_all_ports_for_process(port.process_type)
                 if all_ports:
                     ports_def = all_ports.get(port.port_type, [])
                     if port.position < len(ports_def):
@@ -55,21 +70,36 @@ def update_unknown_port_types():
                         port_type = port_def.get('type', 'Unknown')
                         # ポート名も更新
                         correct_port_name = port_def.get('id')
-                        if correct_port_name and correct_port_name != port.port_name:
-                            old_name = port.port_name
-                            port.port_name = correct_port_name
-                            print(f"Port {port.id:4d}: Renamed {old_name} → {correct_port_name}")
+                        if correct_port_name and correct_port_name != port_name:
+                            print(f"Port {port.id:4d}: Renamed {port_name} → {correct_port_name}")
+                            port_name = correct_port_name
 
             if port_type != "Unknown":
-                old_type = port.data_type
-                port.data_type = port_type
-                print(f"Port {port.id:4d} ({process.name:15s}.{port.port_name:15s}): {old_type:15s} → {port_type}")
+                print(f"Port {port.id:4d} ({port.process_name:15s}.{port_name:15s}): {'Unknown':15s} → {port_type}")
                 updated_count += 1
             else:
-                print(f"Port {port.id:4d} ({process.name:15s}.{port.port_name:15s}): ⏭️  Type not found in YAML")
+                print(f"Port {port.id:4d} ({port.process_name:15s}.{port_name:15s}): ⏭️  Type not found in YAML")
                 skipped_count += 1
 
-        # 変更をコミット
+            if port_type != "Unknown" or port_name != port.port_name:
+                update_rows.append({
+                    'port_id': port.id,
+                    'new_port_name': port_name,
+                    'new_data_type': port_type
+                })
+
+        # 変更を一括反映してコミット
+        if update_rows:
+            ports_table = Port.__table__
+            session.execute(
+                update(ports_table)
+                .where(ports_table.c.id == bindparam('port_id'))
+                .values(
+                    port_name=bindparam('new_port_name'),
+                    data_type=bindparam('new_data_type')
+                ),
+                update_rows
+            )
         session.commit()
 
         print(f"\n{'='*60}")
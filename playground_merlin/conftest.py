@@ -0,0 +1,77 @@
+"""
+ストレージAPIテスト共通フィクスチャ
+
+motoでS3をモックし、テストデータを投入したバケットをセッション内で共有する。
+エンドポイントへの注入は app.dependency_overrides で行う。
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app'))
+
+from services.storage_service import StorageService, StorageConfig, S3Config, get_storage
+from services.s3_service import S3Service
+
+TEST_BUCKET = 'test-bucket'
+TEST_REGION = 'us-east-1'
+
+# バケットに投入するテストデータ（キー -> 本文）
+TEST_OBJECTS = {
+    'runs/1/output.json': b'{"result": "success", "data": [1, 2, 3]}'.ljust(1024),
+    'runs/1/protocol.yaml': b'name: test\n'.ljust(512),
+    'runs/1/artifacts/result.csv': b'a,b\n1,2\n',
+    'runs/2/config.yaml': b'key: value\nlist:\n  - item1\n  - item2',
+    'runs/2/log.txt': '\n'.join(f'line {i}' for i in range(100)).encode('utf-8'),
+}
+
+
+@pytest.fixture(scope="session")
+def aws_mock():
+    """セッション全体で有効なmotoのAWSモック"""
+    mock_aws = pytest.importorskip("moto").mock_aws
+    with mock_aws() as mock:
+        yield mock
+
+
+@pytest.fixture(scope="session")
+def s3_client(aws_mock):
+    """テストデータ投入済みバケットを持つS3クライアント"""
+    StorageService.reset_instance()
+    storage = get_storage(StorageConfig(
+        mode='s3',
+        s3=S3Config(
+            bucket_name=TEST_BUCKET,
+            region=TEST_REGION,
+            access_key_id='testing',
+            secret_access_key='testing'
+        )
+    ))
+    client = storage.backend.client
+    client.create_bucket(Bucket=TEST_BUCKET)
+    for key, body in TEST_OBJECTS.items():
+        client.put_object(Bucket=TEST_BUCKET, Key=key, Body=body)
+    yield client
+    StorageService.reset_instance()
+
+
+@pytest.fixture(scope="session")
+def s3_service(s3_client):
+    """motoのバケットに接続したS3Service"""
+    return S3Service()
+
+
+@pytest.fixture
+def live_s3(aws_mock):
+    """
+    実際のS3に接続するためにmotoを一時停止する（統合テスト用）
+
+    投入済みのテストデータは保持したまま、テスト後にモックを再開する。
+    """
+    aws_mock.stop(remove_data=False)
+    StorageService.reset_instance()
+    yield
+    StorageService.reset_instance()
+    aws_mock.start(reset=False)
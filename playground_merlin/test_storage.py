@@ -6,10 +6,9 @@
 - GET /api/storage/download
 """
 
+import httpx
 import pytest
-from unittest.mock import patch, MagicMock
-from datetime import datetime
-from fastapi.testclient import TestClient
+from unittest.mock import patch, ANY
 from botocore.exceptions import ClientError
 
 # テスト用のmainをインポート
@@ -19,48 +18,33 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app'))
 
 from main import app
+from api.route.storage import get_s3_service, PREVIEW_MAX_BYTES_PER_LINE
+from conftest import TEST_BUCKET
 
-client = TestClient(app)
-
-
-# ==================== Mock Data ====================
-
-def create_mock_s3_list_response():
-    """list_objects_v2のモックレスポンス"""
-    return {
-        'contents': [
-            {
-                'Key': 'runs/1/output.json',
-                'Size': 1024,
-                'LastModified': datetime(2025, 12, 15, 10, 0, 0)
-            },
-            {
-                'Key': 'runs/1/protocol.yaml',
-                'Size': 512,
-                'LastModified': datetime(2025, 12, 15, 9, 0, 0)
-            }
-        ],
-        'common_prefixes': [
-            {'Prefix': 'runs/1/artifacts/'}
-        ]
-    }
-
-
-def create_mock_s3_get_response():
-    """get_objectのモックレスポンス"""
-    return {
-        'body': b'{"result": "success", "data": [1, 2, 3]}',
-        'content_length': 42,
-        'last_modified': datetime(2025, 12, 15, 10, 0, 0)
-    }
-
-
-def create_mock_s3_head_response():
-    """head_objectのモックレスポンス"""
-    return {
-        'content_length': 1024,
-        'last_modified': datetime(2025, 12, 15, 10, 0, 0)
-    }
+# 全テストをanyio（asyncioバックエンド）上の非同期テストとして実行する
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def anyio_backend():
+    return 'asyncio'
+
+
+async def _async_client():
+    """ASGIアプリに直接リクエストを送る非同期クライアント（ソケットを経由しない）"""
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://test"
+    )
+
+
+@pytest.fixture
+async def client(s3_service):
+    """motoバックエンドのS3Serviceを注入したクライアント"""
+    app.dependency_overrides[get_s3_service] = lambda: s3_service
+    async with await _async_client() as c:
+        yield c
+    app.dependency_overrides.pop(get_s3_service, None)
 
 
 # ==================== GET /api/storage/list Tests ====================
@@ -68,14 +52,9 @@ def create_mock_s3_head_response():
 class TestStorageList:
     """GET /api/storage/list のテスト"""
 
-    @patch('api.route.storage.S3Service')
-    def test_list_files_success(self, mock_s3_class):
+    async def test_list_files_success(self, client):
         """正常系: ファイル一覧取得成功"""
-        mock_s3 = MagicMock()
-        mock_s3.list_objects.return_value = create_mock_s3_list_response()
-        mock_s3_class.return_value = mock_s3
-
-        response = client.get("/api/storage/list?prefix=runs/1/")
+        response = await client.get("/api/storage/list?prefix=runs/1/")
 
         assert response.status_code == 200
         data = response.json()
@@ -87,28 +66,18 @@ class TestStorageList:
         assert data['files'][0]['name'] == 'output.json'
         assert data['directories'][0]['name'] == 'artifacts'
 
-    @patch('api.route.storage.S3Service')
-    def test_list_files_empty(self, mock_s3_class):
+    async def test_list_files_empty(self, client):
         """正常系: 空のディレクトリ"""
-        mock_s3 = MagicMock()
-        mock_s3.list_objects.return_value = {'contents': [], 'common_prefixes': []}
-        mock_s3_class.return_value = mock_s3
-
-        response = client.get("/api/storage/list?prefix=runs/empty/")
+        response = await client.get("/api/storage/list?prefix=runs/empty/")
 
         assert response.status_code == 200
         data = response.json()
         assert len(data['files']) == 0
         assert len(data['directories']) == 0
 
-    @patch('api.route.storage.S3Service')
-    def test_list_files_sort_by_size(self, mock_s3_class):
+    async def test_list_files_sort_by_size(self, client):
         """正常系: サイズでソート"""
-        mock_s3 = MagicMock()
-        mock_s3.list_objects.return_value = create_mock_s3_list_response()
-        mock_s3_class.return_value = mock_s3
-
-        response = client.get("/api/storage/list?prefix=runs/1/&sort_by=size&order=desc")
+        response = await client.get("/api/storage/list?prefix=runs/1/&sort_by=size&order=desc")
 
         assert response.status_code == 200
         data = response.json()
@@ -116,31 +85,45 @@ class TestStorageList:
         assert data['files'][0]['name'] == 'output.json'
         assert data['files'][1]['name'] == 'protocol.yaml'
 
-    def test_list_files_missing_prefix(self):
+    async def test_list_files_pagination(self, client, s3_client):
+        """正常系: 1ページに収まらない一覧をページングで全件取得"""
+        for i in range(5):
+            s3_client.put_object(Bucket=TEST_BUCKET, Key=f'runs/paged/{i}.txt', Body=b'x')
+
+        # ページサイズを縮めて複数ページの取得を再現する
+        with patch('services.storage.backends.s3.LIST_PAGE_SIZE', 2), \
+                patch.object(s3_client, 'get_paginator', wraps=s3_client.get_paginator) as get_paginator:
+            response = await client.get("/api/storage/list?prefix=runs/paged/")
+
+            assert response.status_code == 200
+            assert len(response.json()['files']) == 5
+            get_paginator.assert_called_with("list_objects_v2")
+
+            # 2回目はキャッシュから返す
+            await client.get("/api/storage/list?prefix=runs/paged/")
+            assert get_paginator.call_count == 1
+
+    async def test_list_files_missing_prefix(self, client):
         """異常系: prefix未指定"""
-        response = client.get("/api/storage/list")
+        response = await client.get("/api/storage/list")
 
         assert response.status_code == 422  # Validation error
 
-    @patch('api.route.storage.S3Service')
-    def test_list_files_invalid_sort_by(self, mock_s3_class):
+    async def test_list_files_invalid_sort_by(self, client):
         """異常系: 無効なsort_by"""
-        response = client.get("/api/storage/list?prefix=runs/1/&sort_by=invalid")
+        response = await client.get("/api/storage/list?prefix=runs/1/&sort_by=invalid")
 
         assert response.status_code == 400
         assert "sort_by" in response.json()['detail']
 
-    @patch('api.route.storage.S3Service')
-    def test_list_files_s3_error(self, mock_s3_class):
+    async def test_list_files_s3_error(self, client, s3_service):
         """異常系: S3エラー"""
-        mock_s3 = MagicMock()
-        mock_s3.list_objects.side_effect = ClientError(
+        error = ClientError(
             {'Error': {'Code': 'AccessDenied', 'Message': 'Access Denied'}},
             'ListObjectsV2'
         )
-        mock_s3_class.return_value = mock_s3
-
-        response = client.get("/api/storage/list?prefix=runs/1/")
+        with patch.object(s3_service, 'list_objects', side_effect=error):
+            response = await client.get("/api/storage/list?prefix=runs/1/")
 
         assert response.status_code == 403
 
@@ -150,14 +133,9 @@ class TestStorageList:
 class TestStoragePreview:
     """GET /api/storage/preview のテスト"""
 
-    @patch('api.route.storage.S3Service')
-    def test_preview_json_success(self, mock_s3_class):
+    async def test_preview_json_success(self, client):
         """正常系: JSONファイルプレビュー"""
-        mock_s3 = MagicMock()
-        mock_s3.get_object.return_value = create_mock_s3_get_response()
-        mock_s3_class.return_value = mock_s3
-
-        response = client.get("/api/storage/preview?file_path=runs/1/output.json")
+        response = await client.get("/api/storage/preview?file_path=runs/1/output.json")
 
         assert response.status_code == 200
         data = response.json()
@@ -165,61 +143,53 @@ class TestStoragePreview:
         assert 'result' in data['content']
         assert data['truncated'] is False
 
-    @patch('api.route.storage.S3Service')
-    def test_preview_yaml_success(self, mock_s3_class):
+    async def test_preview_yaml_success(self, client):
         """正常系: YAMLファイルプレビュー"""
-        mock_s3 = MagicMock()
-        mock_s3.get_object.return_value = {
-            'body': b'key: value\nlist:\n  - item1\n  - item2',
-            'content_length': 35,
-            'last_modified': datetime(2025, 12, 15, 10, 0, 0)
-        }
-        mock_s3_class.return_value = mock_s3
-
-        response = client.get("/api/storage/preview?file_path=runs/1/config.yaml")
+        response = await client.get("/api/storage/preview?file_path=runs/2/config.yaml")
 
         assert response.status_code == 200
         data = response.json()
         assert data['content_type'] == 'yaml'
 
-    @patch('api.route.storage.S3Service')
-    def test_preview_truncated(self, mock_s3_class):
+    async def test_preview_truncated(self, client, s3_service):
         """正常系: 行数制限による切り詰め"""
-        mock_s3 = MagicMock()
-        # 100行のテストデータ
-        content = '\n'.join([f'line {i}' for i in range(100)])
-        mock_s3.get_object.return_value = {
-            'body': content.encode('utf-8'),
-            'content_length': len(content),
-            'last_modified': datetime(2025, 12, 15, 10, 0, 0)
-        }
-        mock_s3_class.return_value = mock_s3
-
-        response = client.get("/api/storage/preview?file_path=runs/1/log.txt&max_lines=50")
+        # runs/2/log.txt は100行のテストデータ
+        with patch.object(s3_service, 'get_object', wraps=s3_service.get_object) as get_object:
+            response = await client.get("/api/storage/preview?file_path=runs/2/log.txt&max_lines=50")
 
         assert response.status_code == 200
         data = response.json()
         assert data['truncated'] is True
         assert len(data['content'].split('\n')) == 50
+        # 先頭の一部のみを範囲指定で取得していること
+        get_object.assert_called_with(key='runs/2/log.txt', max_bytes=ANY)
+
+    async def test_preview_exactly_max_bytes(self, client, s3_client):
+        """正常系: 取得上限ちょうどのファイルは切り詰め扱いにならず、1バイト超えると切り詰め扱い"""
+        max_bytes = PREVIEW_MAX_BYTES_PER_LINE
+        s3_client.put_object(Bucket=TEST_BUCKET, Key='preview/exact.txt', Body=b'a' * max_bytes)
+        s3_client.put_object(Bucket=TEST_BUCKET, Key='preview/over.txt', Body=b'a' * (max_bytes + 1))
+
+        response = await client.get("/api/storage/preview?file_path=preview/exact.txt&max_lines=1")
+        assert response.status_code == 200
+        assert response.json()['truncated'] is False
+        assert response.json()['content'] == 'a' * max_bytes
+
+        response = await client.get("/api/storage/preview?file_path=preview/over.txt&max_lines=1")
+        assert response.status_code == 200
+        assert response.json()['truncated'] is True
+        assert response.json()['size'] == max_bytes + 1
 
-    def test_preview_binary_file(self):
+    async def test_preview_binary_file(self, client):
         """異常系: バイナリファイル"""
-        response = client.get("/api/storage/preview?file_path=runs/1/data.bin")
+        response = await client.get("/api/storage/preview?file_path=runs/1/data.bin")
 
         assert response.status_code == 415
         assert "Binary" in response.json()['detail']
 
-    @patch('api.route.storage.S3Service')
-    def test_preview_file_not_found(self, mock_s3_class):
+    async def test_preview_file_not_found(self, client):
         """異常系: ファイルが存在しない"""
-        mock_s3 = MagicMock()
-        mock_s3.get_object.side_effect = ClientError(
-            {'Error': {'Code': 'NoSuchKey', 'Message': 'Not Found'}},
-            'GetObject'
-        )
-        mock_s3_class.return_value = mock_s3
-
-        response = client.get("/api/storage/preview?file_path=runs/1/nonexistent.json")
+        response = await client.get("/api/storage/preview?file_path=runs/1/nonexistent.json")
 
         assert response.status_code == 404
 
@@ -229,15 +199,9 @@ class TestStoragePreview:
 class TestStorageDownload:
     """GET /api/storage/download のテスト"""
 
-    @patch('api.route.storage.S3Service')
-    def test_download_success(self, mock_s3_class):
+    async def test_download_success(self, client):
         """正常系: ダウンロードURL生成"""
-        mock_s3 = MagicMock()
-        mock_s3.head_object.return_value = create_mock_s3_head_response()
-        mock_s3.generate_presigned_url.return_value = 'https://example.s3.amazonaws.com/runs/1/output.json?signature=xxx'
-        mock_s3_class.return_value = mock_s3
-
-        response = client.get("/api/storage/download?file_path=runs/1/output.json")
+        response = await client.get("/api/storage/download?file_path=runs/1/output.json")
 
         assert response.status_code == 200
         data = response.json()
@@ -245,38 +209,27 @@ class TestStorageDownload:
         assert 'expires_at' in data
         assert 's3.amazonaws.com' in data['download_url']
 
-    @patch('api.route.storage.S3Service')
-    def test_download_custom_expiry(self, mock_s3_class):
+    async def test_download_custom_expiry(self, client, s3_service):
         """正常系: カスタム有効期限"""
-        mock_s3 = MagicMock()
-        mock_s3.head_object.return_value = create_mock_s3_head_response()
-        mock_s3.generate_presigned_url.return_value = 'https://example.s3.amazonaws.com/test'
-        mock_s3_class.return_value = mock_s3
-
-        response = client.get("/api/storage/download?file_path=runs/1/output.json&expires_in=7200")
+        with patch.object(
+            s3_service, 'generate_presigned_url', wraps=s3_service.generate_presigned_url
+        ) as generate_presigned_url:
+            response = await client.get("/api/storage/download?file_path=runs/1/output.json&expires_in=7200")
 
         assert response.status_code == 200
-        mock_s3.generate_presigned_url.assert_called_once()
-        call_args = mock_s3.generate_presigned_url.call_args
+        generate_presigned_url.assert_called_once()
+        call_args = generate_presigned_url.call_args
         assert call_args[1]['expires_in'] == 7200
 
-    @patch('api.route.storage.S3Service')
-    def test_download_file_not_found(self, mock_s3_class):
+    async def test_download_file_not_found(self, client):
         """異常系: ファイルが存在しない"""
-        mock_s3 = MagicMock()
-        mock_s3.head_object.side_effect = ClientError(
-            {'Error': {'Code': 'NoSuchKey', 'Message': 'Not Found'}},
-            'HeadObject'
-        )
-        mock_s3_class.return_value = mock_s3
-
-        response = client.get("/api/storage/download?file_path=runs/1/nonexistent.json")
+        response = await client.get("/api/storage/download?file_path=runs/1/nonexistent.json")
 
         assert response.status_code == 404
 
-    def test_download_expires_in_too_short(self):
+    async def test_download_expires_in_too_short(self, client):
         """異常系: 有効期限が短すぎる"""
-        response = client.get("/api/storage/download?file_path=runs/1/output.json&expires_in=30")
+        response = await client.get("/api/storage/download?file_path=runs/1/output.json&expires_in=30")
 
         assert response.status_code == 422  # Validation error
 
@@ -293,9 +246,10 @@ class TestStorageIntegration:
         not os.getenv('AWS_ACCESS_KEY_ID'),
         reason="AWS credentials not configured"
     )
-    def test_real_s3_list(self):
+    async def test_real_s3_list(self, live_s3):
         """実際のS3へのリスト操作"""
-        response = client.get("/api/storage/list?prefix=")
+        async with await _async_client() as client:
+            response = await client.get("/api/storage/list?prefix=")
 
         assert response.status_code == 200
 
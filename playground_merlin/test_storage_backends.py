@@ -0,0 +1,202 @@
+"""ストレージバックエンドのユニットテスト
+
+テスト対象:
+- S3StorageBackend.list_objects（サブプレフィックスの並列列挙）
+- S3StorageBackend.delete_many（DeleteObjectsのバッチ分割）
+- S3StorageBackend.save（CRC32チェックサム・マルチパートアップロード）
+- LocalStorageBackend のstatキャッシュ（並列アクセス）
+"""
+
+import base64
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from botocore.exceptions import ClientError
+
+# テスト用のパス設定
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app'))
+
+from services.storage_service import get_storage, LocalConfig, LocalStorageBackend
+import services.storage.backends.local as local_backend
+import services.storage.backends.s3 as s3_backend
+from services.storage.backends.s3 import DELETE_BATCH_SIZE, MULTIPART_THRESHOLD
+from conftest import TEST_BUCKET
+
+
+def put_objects(s3_client, keys):
+    for key in keys:
+        s3_client.put_object(Bucket=TEST_BUCKET, Key=key, Body=b'x')
+
+
+def list_keys(s3_client, prefix):
+    paginator = s3_client.get_paginator('list_objects_v2')
+    return [
+        obj['Key']
+        for page in paginator.paginate(Bucket=TEST_BUCKET, Prefix=prefix)
+        for obj in page.get('Contents', [])
+    ]
+
+
+# ==================== S3 list_objects Tests ====================
+
+class TestS3ListObjects:
+    """S3StorageBackend.list_objects のテスト"""
+
+    def test_keys_in_lexicographic_order(self, s3_client):
+        """サブプレフィックスを並列列挙しても、一括列挙と同じキー順で返す"""
+        keys = ['bulk/list/a-1', 'bulk/list/a.txt', 'bulk/list/a/x', 'bulk/list/a/y',
+                'bulk/list/b', 'bulk/list/c/d/z', 'bulk/list/\u00e4']
+        put_objects(s3_client, reversed(keys))
+        backend = get_storage().backend
+
+        assert [obj['Key'] for obj in backend.list_objects('bulk/list/')] == keys
+        assert list_keys(s3_client, 'bulk/list/') == keys
+
+    def test_executor_shared_between_calls(self, s3_client):
+        """スレッドプールは呼び出しごとに生成せず、共有のものを再利用する"""
+        put_objects(s3_client, ['bulk/pool/a/1', 'bulk/pool/b/2'])
+        backend = get_storage().backend
+        backend.list_objects('bulk/pool/')
+
+        with patch.object(s3_backend, 'ThreadPoolExecutor', wraps=ThreadPoolExecutor) as executor_cls:
+            objects = backend.list_objects('bulk/pool/')
+
+        executor_cls.assert_not_called()
+        assert [obj['Key'] for obj in objects] == ['bulk/pool/a/1', 'bulk/pool/b/2']
+
+
+# ==================== S3 delete_many Tests ====================
+
+class TestS3DeleteMany:
+    """S3StorageBackend.delete_many のテスト"""
+
+    def test_delete_across_batch_boundary(self, s3_client):
+        """DeleteObjectsの上限（1000件）を超えるキーを分割して全件削除する"""
+        keys = [f'bulk/delete/{i:04d}.txt' for i in range(DELETE_BATCH_SIZE + 5)]
+        put_objects(s3_client, keys)
+        backend = get_storage().backend
+
+        with patch.object(s3_client, 'delete_objects', wraps=s3_client.delete_objects) as delete_objects:
+            result = backend.delete_many(keys)
+
+        assert delete_objects.call_count == 2
+        batch_sizes = [len(call.kwargs['Delete']['Objects']) for call in delete_objects.call_args_list]
+        assert batch_sizes == [DELETE_BATCH_SIZE, 5]
+        assert result == {'deleted': keys, 'failed': []}
+        assert list_keys(s3_client, 'bulk/delete/') == []
+
+    def test_failed_batch_reported(self, s3_client):
+        """失敗したバッチのキーのみfailedに入り、他のバッチは削除される"""
+        keys = [f'bulk/partial/{i:04d}.txt' for i in range(DELETE_BATCH_SIZE + 3)]
+        put_objects(s3_client, keys)
+        backend = get_storage().backend
+        delete_objects = s3_client.delete_objects
+
+        def fail_second_batch(**kwargs):
+            if kwargs['Delete']['Objects'][0]['Key'] == keys[DELETE_BATCH_SIZE]:
+                raise ClientError({'Error': {'Code': 'InternalError', 'Message': 'error'}}, 'DeleteObjects')
+            return delete_objects(**kwargs)
+
+        with patch.object(s3_client, 'delete_objects', side_effect=fail_second_batch):
+            result = backend.delete_many(keys)
+
+        assert result == {'deleted': keys[:DELETE_BATCH_SIZE], 'failed': keys[DELETE_BATCH_SIZE:]}
+        assert list_keys(s3_client, 'bulk/partial/') == keys[DELETE_BATCH_SIZE:]
+
+
+# ==================== S3 save Tests ====================
+
+class TestS3Save:
+    """S3StorageBackend.save のテスト"""
+
+    def test_save_sends_crc32(self, s3_client):
+        """小さいペイロードは事前計算したCRC32を付けて1回のPutObjectで保存する"""
+        content = b'checksum target\n' * 100
+        backend = get_storage().backend
+
+        with patch.object(s3_client, 'put_object', wraps=s3_client.put_object) as put_object:
+            assert backend.save('bulk/save/crc.txt', content, 'text/plain')
+
+        expected = base64.b64encode(zlib.crc32(content).to_bytes(4, 'big')).decode('ascii')
+        assert put_object.call_args.kwargs['ChecksumCRC32'] == expected
+        response = s3_client.get_object(Bucket=TEST_BUCKET, Key='bulk/save/crc.txt')
+        assert response['Body'].read() == content
+        assert response['ContentType'] == 'text/plain'
+
+    def test_save_multipart(self, s3_client):
+        """閾値以上のペイロードはマルチパートでアップロードし、内容が一致する"""
+        content = os.urandom(1024) * (MULTIPART_THRESHOLD // 1024) + b'tail'
+        backend = get_storage().backend
+
+        with patch.object(s3_client, 'put_object', wraps=s3_client.put_object) as put_object, \
+                patch.object(s3_client, 'upload_fileobj', wraps=s3_client.upload_fileobj) as upload_fileobj:
+            assert backend.save('bulk/save/large.bin', content)
+
+        put_object.assert_not_called()
+        upload_fileobj.assert_called_once()
+        response = s3_client.get_object(Bucket=TEST_BUCKET, Key='bulk/save/large.bin')
+        assert response['Body'].read() == content
+
+    def test_save_invalidates_listing_cache(self, s3_client):
+        """保存後のディレクトリ一覧に新しいオブジェクトが含まれる"""
+        backend = get_storage().backend
+        assert backend.list_objects_with_dirs('bulk/listing/')['contents'] == []
+
+        assert backend.save('bulk/listing/new.txt', b'new')
+
+        contents = backend.list_objects_with_dirs('bulk/listing/')['contents']
+        assert [obj['Key'] for obj in contents] == ['bulk/listing/new.txt']
+
+
+# ==================== Local stat cache Tests ====================
+
+class TestLocalStatCache:
+    """LocalStorageBackend のstatキャッシュのテスト"""
+
+    def test_concurrent_access_with_eviction(self, tmp_path):
+        """上限での破棄と無効化が並行しても、存在するファイルを不存在と誤判定しない"""
+        for i in range(200):
+            (tmp_path / f'{i}.txt').write_bytes(b'x')
+
+        with patch.object(local_backend, 'STAT_CACHE_MAX_ENTRIES', 50):
+            backend = LocalStorageBackend(LocalConfig(base_path=str(tmp_path)))
+
+        errors = []
+
+        def worker(offset):
+            try:
+                for j in range(2000):
+                    path = f'{(j * 7 + offset) % 200}.txt'
+                    if backend.get_metadata(path) is None:
+                        errors.append(path)
+                    if j % 5 == 0:
+                        backend._invalidate_stat(backend._get_full_path(path))
+            except Exception as e:
+                errors.append(repr(e))
+
+        threads = [threading.Thread(target=worker, args=(k,)) for k in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        assert len(backend._stat_cache) <= 50
+
+    def test_delete_invalidates_stat(self, tmp_path):
+        """削除したファイルはキャッシュ有効期間内でも不存在として扱われる"""
+        backend = LocalStorageBackend(LocalConfig(base_path=str(tmp_path)))
+        paths = [f'{i}.txt' for i in range(local_backend.DELETE_PARALLEL_THRESHOLD + 1)]
+        for path in paths:
+            (tmp_path / path).write_bytes(b'x')
+            assert backend.exists(path)
+
+        result = backend.delete_many(paths)
+
+        assert result == {'deleted': paths, 'failed': []}
+        assert not any(backend.exists(path) for path in paths)
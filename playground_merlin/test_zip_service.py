@@ -0,0 +1,230 @@
+"""ZIPストリーミング生成サービスのユニットテスト
+
+テスト対象:
+- ZipStreamService のプレフィックス一覧キャッシュ
+- manifest.json のシリアライズ
+- ZipStreamService.create_zip_stream（上限チェック・一覧取得失敗時の記録）
+- _ObjectPrefetcher の先読み順序・バイト上限
+"""
+
+import io
+import json
+import threading
+import zipfile
+from unittest.mock import patch
+
+import pytest
+from botocore.exceptions import ClientError
+
+# テスト用のパス設定
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app'))
+
+from services.storage_service import StorageService
+import services.zip_service as zip_service
+from services.zip_service import (
+    ZipStreamService,
+    SizeLimitExceededError,
+    _ManifestRecorder,
+    _ObjectPrefetcher,
+    _shared_listing_cache,
+)
+from conftest import TEST_BUCKET, TEST_OBJECTS
+
+TEST_RUNS = [
+    {'id': 1, 'storage_address': 'runs/1', 'file_name': 'run1.yaml', 'status': 'completed'},
+    {'id': 2, 'storage_address': 'runs/2/', 'file_name': 'run2.yaml', 'status': 'completed'},
+]
+
+
+def read_zip(data: bytes) -> dict:
+    """ZIPを読み戻し、アーカイブ名 -> 内容の辞書を返す"""
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        assert zf.testzip() is None
+        return {name: zf.read(name) for name in zf.namelist()}
+
+
+# ==================== Listing Cache Tests ====================
+
+class TestListingCache:
+    """プレフィックス一覧キャッシュのテスト"""
+
+    def test_listing_cache_scoped_to_bucket(self, s3_client):
+        """一覧はストレージモード・バケットごとに区別してキャッシュされる"""
+        objects = ZipStreamService()._list_prefix('runs/1/')
+
+        assert len(objects) == 3
+        assert _shared_listing_cache.get(('s3', TEST_BUCKET, 'runs/1/')) is objects
+        assert _shared_listing_cache.get(('s3', 'other-bucket', 'runs/1/')) is None
+        assert _shared_listing_cache.get(('local', TEST_BUCKET, 'runs/1/')) is None
+
+    def test_listing_cache_cleared_on_reset(self, s3_client):
+        """StorageService.reset_instance() で一覧キャッシュが破棄される"""
+        ZipStreamService()._list_prefix('runs/2/')
+        assert _shared_listing_cache.get(('s3', TEST_BUCKET, 'runs/2/')) is not None
+
+        # セッション共有のインスタンスはテスト後に元に戻す
+        with patch.object(StorageService, '_instance'), patch.object(StorageService, '_config'):
+            StorageService.reset_instance()
+
+        assert _shared_listing_cache.get(('s3', TEST_BUCKET, 'runs/2/')) is None
+
+
+# ==================== Manifest Tests ====================
+
+class TestManifestJson:
+    """manifest.json のシリアライズのテスト"""
+
+    @staticmethod
+    def _recorder() -> _ManifestRecorder:
+        manifest = _ManifestRecorder(generated_at='2024-01-01T00:00:00.000000Z')
+        manifest.add_run(1, 'プロトコル.yaml', 'completed', 3, 2048)
+        manifest.add_run('2', 'tab\there "quoted"', 'failed', 0, 0)
+        manifest.add_error(3, 'line 1\nline 2\r\n  indented \u2028 \U0001F9EA \x1f')
+        manifest.total_size = 2048
+        return manifest
+
+    def test_matches_json_dumps(self):
+        """json.dumps(indent=2, ensure_ascii=False) とバイト単位で一致する（複数行文字列・Unicodeを含む）"""
+        manifest = self._recorder()
+        expected = json.dumps(manifest.to_dict(), indent=2, ensure_ascii=False).encode('utf-8')
+
+        assert b''.join(manifest.iter_json()) == expected
+        with patch.object(zip_service, 'orjson', None):
+            assert b''.join(manifest.iter_json()) == expected
+
+    def test_empty_manifest_matches_json_dumps(self):
+        """ラン・エラーが空の場合も json.dumps と一致する"""
+        manifest = _ManifestRecorder(generated_at='2024-01-01T00:00:00.000000Z')
+        expected = json.dumps(manifest.to_dict(), indent=2, ensure_ascii=False).encode('utf-8')
+
+        assert b''.join(manifest.iter_json()) == expected
+
+
+# ==================== create_zip_stream Tests ====================
+
+class TestCreateZipStream:
+    """ZipStreamService.create_zip_stream のテスト"""
+
+    def test_round_trip(self, s3_service):
+        """全ランのファイルがZIPに含まれ、manifestに記録される"""
+        data = b''.join(ZipStreamService(s3_service).create_zip_stream(TEST_RUNS))
+        files = read_zip(data)
+
+        for key, body in TEST_OBJECTS.items():
+            run_dir, rest = key[len('runs/'):].split('/', 1)
+            assert files[f'run_{run_dir}/{rest}'] == body
+
+        manifest = json.loads(files['manifest.json'])
+        assert [run['file_count'] for run in manifest['runs']] == [3, 2]
+        assert manifest['errors'] == []
+        assert manifest['total_size'] == sum(len(body) for body in TEST_OBJECTS.values())
+
+    def test_size_limit_raised_before_streaming(self, s3_service):
+        """合計サイズ超過はストリーム開始前に送出され、本文は1件も取得しない"""
+        with patch.object(zip_service, 'MAX_ZIP_SIZE', 100), \
+                patch.object(s3_service, 'get_object_stream') as get_object_stream, \
+                patch.object(s3_service, 'get_object_stream_into') as get_object_stream_into:
+            with pytest.raises(SizeLimitExceededError):
+                ZipStreamService(s3_service).create_zip_stream(TEST_RUNS)
+
+        get_object_stream.assert_not_called()
+        get_object_stream_into.assert_not_called()
+
+    def test_run_count_limit(self, s3_service):
+        """ラン数超過は一覧取得前に送出される"""
+        runs = [{'id': i, 'storage_address': f'runs/{i}'} for i in range(3)]
+        with patch.object(zip_service, 'MAX_RUN_COUNT', 2), \
+                patch.object(s3_service, 'list_objects_recursive') as list_objects_recursive:
+            with pytest.raises(SizeLimitExceededError):
+                ZipStreamService(s3_service).create_zip_stream(runs)
+
+        list_objects_recursive.assert_not_called()
+
+    def test_listing_failure_recorded_in_errors(self, s3_service):
+        """一覧取得に失敗したランはスキップされ、manifestのerrorsに記録される"""
+        list_objects_recursive = s3_service.list_objects_recursive
+
+        def fail_run_2(prefix):
+            if prefix == 'runs/2/':
+                raise ClientError({'Error': {'Code': 'AccessDenied', 'Message': 'Access Denied'}}, 'ListObjectsV2')
+            return list_objects_recursive(prefix)
+
+        with patch.object(s3_service, 'list_objects_recursive', side_effect=fail_run_2):
+            data = b''.join(ZipStreamService(s3_service).create_zip_stream(TEST_RUNS))
+        files = read_zip(data)
+
+        manifest = json.loads(files['manifest.json'])
+        assert [run['run_id'] for run in manifest['runs']] == [1]
+        assert len(manifest['errors']) == 1
+        assert manifest['errors'][0]['run_id'] == 2
+        assert 'AccessDenied' in manifest['errors'][0]['error']
+        assert not any(name.startswith('run_2/') for name in files)
+
+
+# ==================== _ObjectPrefetcher Tests ====================
+
+class TestObjectPrefetcher:
+    """_ObjectPrefetcher のテスト"""
+
+    @staticmethod
+    def _prefetcher(sizes, **kwargs):
+        fetched = []
+        lock = threading.Lock()
+
+        def fetch(key):
+            with lock:
+                fetched.append(key)
+            return key.encode()
+
+        prefetcher = _ObjectPrefetcher(fetch, **kwargs)
+        for i, size in enumerate(sizes):
+            prefetcher.add(f'key{i}', size)
+        return prefetcher, fetched
+
+    def test_results_in_registration_order(self):
+        """取得は並列でも登録順に取り出され、上限サイズ超のオブジェクトは先読みしない"""
+        sizes = [10, 10, 1000, 10, 10, 1000, 10]
+        prefetcher, fetched = self._prefetcher(sizes, depth=3, max_object_size=100, max_workers=4)
+        try:
+            for i, size in enumerate(sizes):
+                future = prefetcher.take(i)
+                if size > 100:
+                    assert future is None
+                else:
+                    assert future.result() == f'key{i}'.encode()
+        finally:
+            prefetcher.close()
+
+        assert sorted(fetched) == sorted(f'key{i}' for i, size in enumerate(sizes) if size <= 100)
+
+    def test_buffered_bytes_capped(self):
+        """先読み中の合計サイズはmax_buffered_bytesを超えない（上限サイズ超のオブジェクトは計上しない）"""
+        sizes = [100, 1000, 100, 100, 100, 1000, 100, 100]
+        prefetcher, fetched = self._prefetcher(
+            sizes, depth=8, max_object_size=500, max_workers=2, max_buffered_bytes=250
+        )
+        try:
+            for i in range(len(sizes)):
+                prefetcher.take(i)
+                assert prefetcher._buffered_bytes <= 250
+                assert sum(sizes[j] for j in prefetcher._futures) == prefetcher._buffered_bytes
+        finally:
+            prefetcher.close()
+
+        assert 'key1' not in fetched and 'key5' not in fetched
+
+    def test_current_entry_fetched_even_above_cap(self):
+        """バイト上限より大きいエントリでも、取り出し対象のエントリは常に取得する"""
+        prefetcher, fetched = self._prefetcher(
+            [300, 100], depth=8, max_object_size=500, max_buffered_bytes=250
+        )
+        try:
+            assert prefetcher.take(0).result() == b'key0'
+            # 上限を超えるため後続は先読みしない
+            assert prefetcher._futures == {}
+            assert prefetcher.take(1).result() == b'key1'
+        finally:
+            prefetcher.close()